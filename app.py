@@ -1,10 +1,13 @@
-from flask import Flask, render_template, request, flash, redirect, url_for, jsonify, send_file
+from flask import Flask, render_template, request, flash, redirect, url_for, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS  # Add this import
 import pickle
 import os
+import hashlib
 import numpy as np
 from datetime import datetime
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 from werkzeug.utils import secure_filename
 import PyPDF2
@@ -12,8 +15,19 @@ from PIL import Image
 import io
 import base64
 import json
+import time
+import uuid
 from dotenv import load_dotenv
 from google import genai 
+from explain import TreeExplainer
+from jobs import JobQueue, FINISHED_STATES
+from drift import DriftMonitor, load_baseline, read_rows, prometheus_lines
+from cache import AnalysisCache, save_and_hash, analysis_key, text_key
+from profiling import ProfilingMiddleware, list_profiles
+from triage import EmergencyMatcher
+from retrieval import KnowledgeIndex, load_faq
+from usage import UsageTracker, prometheus_lines as usage_prometheus_lines
+from logs import configure_logging, AuditTrail
 # Load environment variables
 load_dotenv()
 
@@ -27,8 +41,64 @@ app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 16777216)
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'pdf', 'txt'}
 app.config['GEMINI_API_KEY'] = os.getenv('GEMINI_API_KEY')
 
+# Batch explanations
+app.config['EXPLAIN_MAX_ROWS'] = int(os.getenv('EXPLAIN_MAX_ROWS', 500))
+
+# Multi-disease screening
+app.config['SCREENING_WORKERS'] = int(os.getenv('SCREENING_WORKERS', 3))
+app.config['SCREENING_MAX_PATIENTS'] = int(os.getenv('SCREENING_MAX_PATIENTS', 500))
+
+# Background analysis jobs
+app.config['JOB_DB_PATH'] = os.getenv('JOB_DB_PATH', './jobs.db')
+app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', 2))
+app.config['JOB_MAX_RETRIES'] = int(os.getenv('JOB_MAX_RETRIES', 2))
+app.config['JOB_RESULT_TTL'] = int(os.getenv('JOB_RESULT_TTL', 3600))  # 1 hour
+# Each events subscriber holds a web worker thread; streams end after this long
+app.config['JOB_EVENTS_MAX_SECONDS'] = int(os.getenv('JOB_EVENTS_MAX_SECONDS', 30))
+
+# Content-addressed cache of document/image analyses
+app.config['ANALYSIS_CACHE_PATH'] = os.getenv('ANALYSIS_CACHE_PATH', './analysis_cache.db')
+app.config['ANALYSIS_CACHE_MAX_BYTES'] = int(os.getenv('ANALYSIS_CACHE_MAX_BYTES', 67108864))  # 64MB
+app.config['ANALYSIS_CACHE_MAX_ENTRIES'] = int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', 5000))
+app.config['ANALYSIS_CACHE_TTL'] = int(os.getenv('ANALYSIS_CACHE_TTL', 604800))  # 7 days
+
+# On-demand request profiling (off unless a token or sample rate is set)
+app.config['PROFILE_ADMIN_TOKEN'] = os.getenv('PROFILE_ADMIN_TOKEN')
+app.config['PROFILE_SAMPLE_RATE'] = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+app.config['PROFILE_DIR'] = os.getenv('PROFILE_DIR', './profiles')
+app.config['PROFILE_KEEP'] = int(os.getenv('PROFILE_KEEP', 100))
+
+# Local knowledge base answers common questions without calling Gemini
+app.config['RETRIEVAL_ENABLED'] = os.getenv('RETRIEVAL_ENABLED', 'true').lower() == 'true'
+app.config['RETRIEVAL_MIN_CONFIDENCE'] = float(os.getenv('RETRIEVAL_MIN_CONFIDENCE', 0.75))
+app.config['FAQ_PATH'] = os.getenv('FAQ_PATH', './dataset/faq.json')
+
+# Structured logging and prediction audit trail (written by background threads)
+app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO').upper()
+app.config['LOG_SAMPLE_RATE'] = float(os.getenv('LOG_SAMPLE_RATE', 0.1))
+app.config['AUDIT_ENABLED'] = os.getenv('AUDIT_ENABLED', 'true').lower() == 'true'
+app.config['AUDIT_DIR'] = os.getenv('AUDIT_DIR', './audit')
+app.config['AUDIT_MAX_BYTES'] = int(os.getenv('AUDIT_MAX_BYTES', 10485760))  # 10MB
+
 # Create uploads directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'jobs'), exist_ok=True)
+
+log = configure_logging(app.config['LOG_LEVEL'], app.config['LOG_SAMPLE_RATE'])
+audit_trail = AuditTrail(app.config['AUDIT_DIR'], max_bytes=app.config['AUDIT_MAX_BYTES']) if app.config['AUDIT_ENABLED'] else None
+
+# Only wrap the app when profiling is configured; otherwise requests take the plain path
+profiler = None
+if app.config['PROFILE_ADMIN_TOKEN'] or app.config['PROFILE_SAMPLE_RATE'] > 0:
+    profiler = ProfilingMiddleware(
+        app.wsgi_app,
+        app.config['PROFILE_DIR'],
+        admin_token=app.config['PROFILE_ADMIN_TOKEN'],
+        sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+        keep=app.config['PROFILE_KEEP']
+    )
+    app.wsgi_app = profiler
+    print(f"✓ Request profiling enabled (sample rate {app.config['PROFILE_SAMPLE_RATE']}), captures in {app.config['PROFILE_DIR']}")
 
 # Configure Gemini API
 CHATBOT_NAME = "HealthAI Assistant"
@@ -54,23 +124,136 @@ except Exception as e:
 # Load ML models
 working_dir = os.path.dirname(os.path.abspath(__file__))
 models = {}
+model_info = {}
 
-try:
-    models['diabetes'] = pickle.load(open(f'{working_dir}/saved_models/diabetes.pkl', 'rb'))
-    models['heart'] = pickle.load(open(f'{working_dir}/saved_models/heart.pkl', 'rb'))
-    models['kidney'] = pickle.load(open(f'{working_dir}/saved_models/kidney.pkl', 'rb'))
+# Create dummy models for development if real ones fail
+class DummyModel:
+    def predict(self, X):
+        return [random.randint(0, 1) for _ in X]
+    def predict_proba(self, X):
+        return [[random.random(), random.random()] for _ in X]
+
+for model_name in ['diabetes', 'heart', 'kidney']:
+    model_path = f'{working_dir}/saved_models/{model_name}.pkl'
+    try:
+        with open(model_path, 'rb') as f:
+            model_bytes = f.read()
+        models[model_name] = pickle.loads(model_bytes)
+        model_info[model_name] = {
+            'status': 'loaded',
+            'type': type(models[model_name]).__name__,
+            # Content hash doubles as the model version
+            'version': hashlib.sha256(model_bytes).hexdigest()[:12],
+            'loaded_at': datetime.now().isoformat()
+        }
+    except Exception as e:
+        print(f"✗ Error loading {model_name} model: {str(e)}")
+        models[model_name] = DummyModel()
+        model_info[model_name] = {'status': 'fallback', 'type': 'DummyModel', 'version': None, 'error': str(e)}
+
+if all(info['status'] == 'loaded' for info in model_info.values()):
     print("✓ ML models loaded successfully")
-except Exception as e:
-    print(f"✗ Error loading models: {str(e)}")
-    # Create dummy models for development if real ones fail
-    class DummyModel:
-        def predict(self, X):
-            return [random.randint(0, 1)]
-        def predict_proba(self, X):
-            return [[random.random(), random.random()]]
+
+# Feature layout of each model's input vector (same order the routes build it)
+FEATURE_NAMES = {
+    'diabetes': [
+        'pregnancies', 'glucose', 'blood_pressure', 'skin_thickness', 'insulin',
+        'bmi', 'diabetes_pedigree', 'age', 'new_bmi_underweight',
+        'new_bmi_overweight', 'new_bmi_obesity_1', 'new_bmi_obesity_2',
+        'new_bmi_obesity_3', 'new_insulin_normal', 'new_glucose_low',
+        'new_glucose_normal', 'new_glucose_overweight', 'new_glucose_secret'
+    ],
+    'heart': [
+        'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach',
+        'exang', 'oldpeak', 'slope', 'ca', 'thal'
+    ],
+    'kidney': [
+        'age', 'blood_pressure', 'specific_gravity', 'albumin', 'sugar',
+        'red_blood_cells', 'pus_cell', 'pus_cell_clumps', 'bacteria',
+        'blood_glucose_random', 'blood_urea', 'serum_creatinine', 'sodium',
+        'potassium', 'haemoglobin', 'packed_cell_volume',
+        'white_blood_cell_count', 'red_blood_cell_count', 'hypertension',
+        'diabetes_mellitus', 'coronary_artery_disease', 'appetite',
+        'peda_edema', 'aanemia'
+    ]
+}
+
+DIABETES_INPUT_FIELDS = ['pregnancies', 'glucose', 'blood_pressure', 'skin_thickness', 'insulin',
+                         'bmi', 'diabetes_pedigree', 'age']
+
+def diabetes_features(pregnancies, glucose, blood_pressure, skin_thickness, insulin,
+                      bmi, diabetes_pedigree, age):
+    """Build the diabetes model input, including its engineered category indicators"""
+    # BMI categories
+    new_bmi_underweight = 1 if bmi <= 18.5 else 0
+    new_bmi_overweight = 1 if 24.9 < bmi <= 29.9 else 0
+    new_bmi_obesity_1 = 1 if 29.9 < bmi <= 34.9 else 0
+    new_bmi_obesity_2 = 1 if 34.9 < bmi <= 39.9 else 0
+    new_bmi_obesity_3 = 1 if bmi > 39.9 else 0
     
-    for model_name in ['diabetes', 'heart', 'kidney']:
-        models[model_name] = DummyModel()
+    # Insulin categories
+    new_insulin_normal = 1 if 16 <= insulin <= 166 else 0
+    
+    # Glucose categories
+    if glucose <= 70:
+        new_glucose_low, new_glucose_normal, new_glucose_overweight, new_glucose_secret = 1, 0, 0, 0
+    elif 70 < glucose <= 99:
+        new_glucose_low, new_glucose_normal, new_glucose_overweight, new_glucose_secret = 0, 1, 0, 0
+    elif 99 < glucose <= 126:
+        new_glucose_low, new_glucose_normal, new_glucose_overweight, new_glucose_secret = 0, 0, 1, 0
+    else:
+        new_glucose_low, new_glucose_normal, new_glucose_overweight, new_glucose_secret = 0, 0, 0, 1
+    
+    return [
+        pregnancies, glucose, blood_pressure, skin_thickness, insulin,
+        bmi, diabetes_pedigree, age, new_bmi_underweight,
+        new_bmi_overweight, new_bmi_obesity_1, new_bmi_obesity_2,
+        new_bmi_obesity_3, new_insulin_normal, new_glucose_low,
+        new_glucose_normal, new_glucose_overweight, new_glucose_secret
+    ]
+
+# Precompute TreeSHAP tables so explanations cost well under a millisecond per row
+explainers = {}
+for model_name, model in models.items():
+    try:
+        explainers[model_name] = TreeExplainer(model, FEATURE_NAMES[model_name])
+    except Exception as e:
+        print(f"✗ Explanations unavailable for {model_name}: {str(e)}")
+if explainers:
+    print(f"✓ Feature explanations ready for: {', '.join(explainers)}")
+
+# Training-data columns behind each model input, used as drift baselines.
+# Engineered diabetes indicators are derived from these and not tracked separately.
+DRIFT_BASELINES = {
+    'diabetes': ('diabetes.csv', {
+        'pregnancies': 'Pregnancies', 'glucose': 'Glucose', 'blood_pressure': 'BloodPressure',
+        'skin_thickness': 'SkinThickness', 'insulin': 'Insulin', 'bmi': 'BMI',
+        'diabetes_pedigree': 'DiabetesPedigreeFunction', 'age': 'Age'
+    }),
+    'heart': ('heart.csv', {name: name for name in FEATURE_NAMES['heart']}),
+    'kidney': ('kidney_disease.csv', {
+        'age': 'age', 'blood_pressure': 'bp', 'specific_gravity': 'sg', 'albumin': 'al',
+        'sugar': 'su', 'red_blood_cells': 'rbc', 'pus_cell': 'pc', 'pus_cell_clumps': 'pcc',
+        'bacteria': 'ba', 'blood_glucose_random': 'bgr', 'blood_urea': 'bu',
+        'serum_creatinine': 'sc', 'sodium': 'sod', 'potassium': 'pot', 'haemoglobin': 'hemo',
+        'packed_cell_volume': 'pcv', 'white_blood_cell_count': 'wc', 'red_blood_cell_count': 'rc',
+        'hypertension': 'htn', 'diabetes_mellitus': 'dm', 'coronary_artery_disease': 'cad',
+        'appetite': 'appet', 'peda_edema': 'pe', 'aanemia': 'ane'
+    })
+}
+# Label encoding used when the kidney model was trained (alphabetical per column)
+KIDNEY_CATEGORIES = {
+    'abnormal': 0, 'normal': 1, 'notpresent': 0, 'present': 1,
+    'no': 0, 'yes': 1, 'good': 0, 'poor': 1
+}
+
+drift_monitors = {}
+for model_name, (csv_name, column_map) in DRIFT_BASELINES.items():
+    try:
+        baseline = load_baseline(f'{working_dir}/dataset/{csv_name}', column_map, KIDNEY_CATEGORIES)
+        drift_monitors[model_name] = DriftMonitor(FEATURE_NAMES[model_name], baseline)
+    except Exception as e:
+        print(f"✗ Drift monitoring unavailable for {model_name}: {str(e)}")
 
 # Utility Functions
 def allowed_file(filename):
@@ -95,14 +278,26 @@ def extract_text_from_pdf(file_path):
     except Exception as e:
         return f"Error reading PDF: {str(e)}"
 
-def get_gemini_response(user_message, file_path=None, file_type=None):
-    """Get response from Gemini API with NEW SDK syntax"""
-    
-    if not gemini_client:
-        return "⚠️ Health information service is currently unavailable. Please try again later."
+analysis_cache = AnalysisCache(
+    app.config['ANALYSIS_CACHE_PATH'],
+    max_bytes=app.config['ANALYSIS_CACHE_MAX_BYTES'],
+    max_entries=app.config['ANALYSIS_CACHE_MAX_ENTRIES'],
+    ttl=app.config['ANALYSIS_CACHE_TTL']
+)
 
-    # Enhanced health-specific system prompt
-    system_prompt = """You are HealthAI Assistant, a specialized healthcare AI with expertise in:
+def extract_pdf_text_cached(file_path, content_hash=None):
+    """extract_text_from_pdf, reusing text already extracted from identical content"""
+    if content_hash:
+        cached = analysis_cache.get(text_key(content_hash))
+        if cached is not None:
+            return cached
+    text = extract_text_from_pdf(file_path)
+    if content_hash and "Error reading PDF" not in text:
+        analysis_cache.put(text_key(content_hash), text)
+    return text
+
+# Enhanced health-specific system prompt
+SYSTEM_PROMPT = """You are HealthAI Assistant, a specialized healthcare AI with expertise in:
     1. Medical information and disease education
     2. Symptom analysis (NOT diagnosis)
     3. Health and wellness guidance
@@ -129,44 +324,56 @@ def get_gemini_response(user_message, file_path=None, file_type=None):
     
     Tone: Professional, empathetic, helpful but cautious."""
 
-    try:
-        if file_path and os.path.exists(file_path):
-            if file_type and file_type.startswith('image/'):
-                # Image analysis with Gemini Vision
-                try:
-                    from PIL import Image
-                    img = Image.open(file_path)
-                    
-                    # Prepare the prompt for image analysis
-                    full_prompt = f"{system_prompt}\n\nUser's message: {user_message}\n\nPlease analyze this image for health-related content. Remember: Do not diagnose, only provide educational information about what you see."
-                    
-                    # NEW SDK syntax for image
-                    response = gemini_client.models.generate_content(
-                        model="gemini-1.5-flash",
-                        contents=[full_prompt, img]
-                    )
-                    
-                    # Add additional disclaimer for image analysis
-                    result = response.text + "\n\n**⚠️ Important**: This image analysis is for educational purposes only and should not be used for diagnosis. Please consult a healthcare professional for medical advice."
-                    return result
-                    
-                except Exception as img_error:
-                    print(f"Image analysis error: {img_error}")
-                    return "⚠️ I had trouble analyzing the image. Please make sure it's a clear image and try again, or consult a healthcare professional directly."
-            
-            elif file_type == 'application/pdf':
-                # PDF text analysis
-                try:
-                    pdf_text = extract_text_from_pdf(file_path)
-                    
-                    if "Error reading PDF" in pdf_text:
-                        return "⚠️ I couldn't read the PDF file properly. Please make sure it's not password protected and contains extractable text."
-                    
-                    # Truncate if too long for context
-                    if len(pdf_text) > 8000:
-                        pdf_text = pdf_text[:8000] + "\n\n[Document truncated due to length]"
-                    
-                    prompt = f"""{system_prompt}
+# Bump when the request templates below change so cached answers are not reused
+PROMPT_VERSION = '1-' + hashlib.sha256(SYSTEM_PROMPT.encode('utf-8')).hexdigest()[:12]
+
+GEMINI_MODELS = {
+    'image': "gemini-1.5-flash",
+    'pdf': "gemini-1.5-pro",
+    # Use gemini-2.5-flash for chat (NEW model)
+    'text': "gemini-2.5-flash"
+}
+
+GEMINI_UNAVAILABLE_MESSAGE = "⚠️ Health information service is currently unavailable. Please try again later."
+UNREADABLE_PDF_MESSAGE = "⚠️ I couldn't read the PDF file properly. Please make sure it's not password protected and contains extractable text."
+IMAGE_DISCLAIMER = "\n\n**⚠️ Important**: This image analysis is for educational purposes only and should not be used for diagnosis. Please consult a healthcare professional for medical advice."
+
+class UnreadablePDFError(Exception):
+    """Raised when no text can be extracted from an uploaded PDF"""
+
+def gemini_request_kind(file_path=None, file_type=None):
+    """Classify a chatbot request as 'image', 'pdf' or 'text'"""
+    if file_path and os.path.exists(file_path):
+        if file_type and file_type.startswith('image/'):
+            return 'image'
+        elif file_type == 'application/pdf':
+            return 'pdf'
+    return 'text'
+
+def build_gemini_request(user_message, file_path=None, file_type=None, content_hash=None):
+    """Build (model, contents, footer) for a chatbot request
+
+    Shared by the Flask and ASGI apps so both send identical prompts.
+    """
+    kind = gemini_request_kind(file_path, file_type)
+
+    if kind == 'image':
+        # Image analysis with Gemini Vision
+        img = Image.open(file_path)
+        full_prompt = f"{SYSTEM_PROMPT}\n\nUser's message: {user_message}\n\nPlease analyze this image for health-related content. Remember: Do not diagnose, only provide educational information about what you see."
+        return GEMINI_MODELS['image'], [full_prompt, img], IMAGE_DISCLAIMER
+
+    if kind == 'pdf':
+        # PDF text analysis
+        pdf_text = extract_pdf_text_cached(file_path, content_hash)
+        if "Error reading PDF" in pdf_text:
+            raise UnreadablePDFError(pdf_text)
+
+        # Truncate if too long for context
+        if len(pdf_text) > 8000:
+            pdf_text = pdf_text[:8000] + "\n\n[Document truncated due to length]"
+
+        prompt = f"""{SYSTEM_PROMPT}
 
                     DOCUMENT CONTENT (for context only):
                     {pdf_text}
@@ -179,48 +386,295 @@ def get_gemini_response(user_message, file_path=None, file_type=None):
                     2. Do NOT interpret results or provide diagnoses
                     3. Suggest what type of healthcare professional to consult
                     4. Include important disclaimers"""
-                    
-                    # NEW SDK syntax for text
-                    response = gemini_client.models.generate_content(
-                        model="gemini-1.5-pro",
-                        contents=prompt
-                    )
-                    return response.text
-                    
-                except Exception as pdf_error:
-                    print(f"PDF analysis error: {pdf_error}")
-                    return "⚠️ I had trouble analyzing the PDF. Please try again or consult a healthcare professional for interpretation of medical documents."
-        
-        # Text-only request
-        prompt = f"""{system_prompt}
+        return GEMINI_MODELS['pdf'], prompt, ""
+
+    # Text-only request
+    prompt = f"""{SYSTEM_PROMPT}
         
         USER'S QUESTION:
         {user_message}
         
         Please provide a helpful, informative response following all the rules above."""
+    return GEMINI_MODELS['text'], prompt, ""
+
+def gemini_error_message(kind, e):
+    """User-facing message for a failed Gemini request"""
+    if kind == 'image':
+        return "⚠️ I had trouble analyzing the image. Please make sure it's a clear image and try again, or consult a healthcare professional directly."
+    if kind == 'pdf':
+        return "⚠️ I had trouble analyzing the PDF. Please try again or consult a healthcare professional for interpretation of medical documents."
+
+    # Provide helpful error messages
+    if "API_KEY_INVALID" in str(e) or "403" in str(e):
+        return "⚠️ Invalid Gemini API key. Please check your .env file configuration."
+    elif "429" in str(e) or "quota" in str(e).lower():
+        return "⚠️ API quota exceeded. Please try again later or check your Google Cloud billing."
+    elif "503" in str(e) or "unavailable" in str(e).lower():
+        return "⚠️ Gemini API service temporarily unavailable. Please try again in a moment."
+    elif "model not found" in str(e).lower():
+        return "⚠️ Model not found. Please use 'gemini-2.0-flash' or 'gemini-1.5-flash' instead."
+    else:
+        return f"⚠️ I'm experiencing difficulties connecting to the health information service. Error: {str(e)[:100]}"
+
+def analysis_cache_key(user_message, file_path=None, file_type=None, content_hash=None):
+    """Cache key for a document/image analysis, or None for requests that aren't cached"""
+    kind = gemini_request_kind(file_path, file_type)
+    if not content_hash or kind == 'text':
+        return None
+    return analysis_key(content_hash, user_message, GEMINI_MODELS[kind], PROMPT_VERSION)
+
+llm_usage = UsageTracker()
+
+def prompt_size(contents):
+    """UTF-8 bytes of the text parts of a Gemini request"""
+    parts = contents if isinstance(contents, list) else [contents]
+    return sum(len(part.encode('utf-8')) for part in parts if isinstance(part, str))
+
+def record_llm_usage(model, kind, contents, file_path, started, first_byte=None, usage=None, error=False):
+    """Account one Gemini call; started/first_byte are time.perf_counter() values"""
+    finished = time.perf_counter()
+    try:
+        attachment_bytes = os.path.getsize(file_path) if file_path else 0
+    except OSError:
+        attachment_bytes = 0
+    llm_usage.record(
+        model, kind,
+        prompt_tokens=getattr(usage, 'prompt_token_count', None) or 0,
+        output_tokens=getattr(usage, 'candidates_token_count', None) or 0,
+        prompt_bytes=prompt_size(contents),
+        attachment_bytes=attachment_bytes,
+        # Non-streaming calls deliver the whole answer at once
+        ttfb=(first_byte or finished) - started,
+        latency=finished - started,
+        error=error
+    )
+
+def get_gemini_response(user_message, file_path=None, file_type=None, raise_errors=False, content_hash=None):
+    """Get response from Gemini API with NEW SDK syntax
+
+    With raise_errors=True, API failures propagate instead of being turned into
+    a user-facing message, so background jobs can retry them. Passing the
+    upload's content_hash enables the analysis cache.
+    """
+    
+    cache_key = analysis_cache_key(user_message, file_path, file_type, content_hash)
+    if cache_key:
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if not gemini_client:
+        if raise_errors:
+            raise RuntimeError("Gemini client is not configured")
+        return GEMINI_UNAVAILABLE_MESSAGE
+
+    kind = gemini_request_kind(file_path, file_type)
+    try:
+        model, contents, footer = build_gemini_request(user_message, file_path, file_type, content_hash)
+        started = time.perf_counter()
+        try:
+            response = gemini_client.models.generate_content(model=model, contents=contents)
+        except Exception:
+            record_llm_usage(model, kind, contents, file_path, started, error=True)
+            raise
+        record_llm_usage(model, kind, contents, file_path, started, usage=response.usage_metadata)
+        result = response.text + footer
+        if cache_key:
+            analysis_cache.put(cache_key, result)
+        return result
         
-        # Use gemini-2.5-flash for chat (NEW model)
-        response = gemini_client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
-        )
-        return response.text
-        
+    except UnreadablePDFError:
+        return UNREADABLE_PDF_MESSAGE
     except Exception as e:
-        print(f"🔥 Gemini API error: {str(e)}")
-        print(f"🔥 Error type: {type(e).__name__}")
-        
-        # Provide helpful error messages
-        if "API_KEY_INVALID" in str(e) or "403" in str(e):
-            return "⚠️ Invalid Gemini API key. Please check your .env file configuration."
-        elif "429" in str(e) or "quota" in str(e).lower():
-            return "⚠️ API quota exceeded. Please try again later or check your Google Cloud billing."
-        elif "503" in str(e) or "unavailable" in str(e).lower():
-            return "⚠️ Gemini API service temporarily unavailable. Please try again in a moment."
-        elif "model not found" in str(e).lower():
-            return "⚠️ Model not found. Please use 'gemini-2.0-flash' or 'gemini-1.5-flash' instead."
-        else:
-            return f"⚠️ I'm experiencing difficulties connecting to the health information service. Error: {str(e)[:100]}"
+        log.exception('gemini_error', extra={'fields': {'request_type': kind, 'error_type': type(e).__name__}})
+        if raise_errors:
+            raise
+        return gemini_error_message(kind, e)
+
+
+def explain_prediction(disease, user_input, top_k=5):
+    """Return the top feature contributions for a single prediction, or None if unavailable"""
+    explainer = explainers.get(disease)
+    if explainer is None:
+        return None
+    try:
+        return explainer.explain([user_input], top_k=top_k)[0]
+    except Exception as e:
+        log.exception('explanation_failed', extra={'fields': {'model': disease, 'error': str(e)}})
+        return None
+
+def run_analysis_job(payload):
+    """Background handler for queued chatbot analyses"""
+    bot_response = get_gemini_response(
+        payload.get('message', ''),
+        payload.get('file_path'),
+        payload.get('file_type'),
+        raise_errors=True,
+        content_hash=payload.get('content_hash')
+    )
+    return {'response': bot_response, 'has_file': bool(payload.get('file_path'))}
+
+def cleanup_analysis_job(payload):
+    """Remove a job's uploaded file once the job is finished"""
+    file_path = payload.get('file_path')
+    if file_path and os.path.exists(file_path):
+        os.remove(file_path)
+
+job_queue = JobQueue(
+    app.config['JOB_DB_PATH'],
+    workers=app.config['JOB_WORKERS'],
+    max_retries=app.config['JOB_MAX_RETRIES'],
+    result_ttl=app.config['JOB_RESULT_TTL']
+)
+job_queue.register('analysis', run_analysis_job, cleanup=cleanup_analysis_job)
+# The prefork runner starts the workers in each forked process instead of the master
+if os.getenv('JOB_AUTOSTART', 'true').lower() == 'true':
+    job_queue.start()
+
+# Readiness of this process; set once warm_up() has run
+service_state = {
+    'ready': False,
+    'started_at': datetime.now().isoformat(),
+    'warmed_up_at': None,
+    'warm_up_ms': None
+}
+
+def sample_inputs(disease, limit=8):
+    """Model input vectors built from complete rows of the training CSV"""
+    csv_name, column_map = DRIFT_BASELINES[disease]
+    rows = read_rows(f'{working_dir}/dataset/{csv_name}', column_map, KIDNEY_CATEGORIES, limit)
+    if disease == 'diabetes':
+        return [diabetes_features(**row) for row in rows]
+    return [[row[name] for name in FEATURE_NAMES[disease]] for row in rows]
+
+def warm_up():
+    """Run predictions on dataset rows so the first real request sees steady-state latency"""
+    start = time.perf_counter()
+    for name, model in models.items():
+        try:
+            rows = sample_inputs(name)
+            for row in rows:
+                model.predict([row])
+                model.predict_proba([row])
+            if name in explainers:
+                explainers[name].explain(rows[:1])
+                explainers[name].explain(rows)
+            model_info[name]['warmed_up'] = True
+        except Exception as e:
+            print(f"✗ Warm-up failed for {name}: {str(e)}")
+            model_info[name]['warmed_up'] = False
+
+    # Compile the page templates ahead of the first render
+    for template in ('base.html', 'home.html', 'diabetes.html', 'heart.html', 'kidney.html', 'chatbot.html'):
+        try:
+            app.jinja_env.get_template(template)
+        except Exception as e:
+            print(f"✗ Template warm-up failed for {template}: {str(e)}")
+
+    service_state['ready'] = True
+    service_state['warmed_up_at'] = datetime.now().isoformat()
+    service_state['warm_up_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    print(f"✓ Warm-up finished in {service_state['warm_up_ms']} ms (pid {os.getpid()})")
+
+def service_status():
+    """Per-model load state, versions and LLM availability for this process"""
+    return {
+        'ready': service_state['ready'] and all(info['status'] == 'loaded' for info in model_info.values()),
+        'pid': os.getpid(),
+        'started_at': service_state['started_at'],
+        'warmed_up_at': service_state['warmed_up_at'],
+        'warm_up_ms': service_state['warm_up_ms'],
+        'models': model_info,
+        'explanations': sorted(explainers),
+        'llm': {'gemini': 'configured' if gemini_client else 'not_configured'}
+    }
+
+def record_prediction_input(disease, user_input):
+    """Fold a model input into its drift statistics; never fails the prediction"""
+    monitor = drift_monitors.get(disease)
+    if monitor is None:
+        return
+    try:
+        monitor.update(user_input)
+    except Exception as e:
+        log.exception('drift_update_failed', extra={'fields': {'model': disease, 'error': str(e)}})
+
+def audit_predictions(disease, X, predictions, probabilities, started, source):
+    """Queue audit records for a batch of predictions; the file is written in the background"""
+    if audit_trail is None:
+        return
+    latency_ms = round((time.perf_counter() - started) * 1000, 3)
+    timestamp = datetime.now().isoformat()
+    feature_names = FEATURE_NAMES[disease]
+    version = model_info.get(disease, {}).get('version')
+    rows = np.atleast_2d(np.asarray(X, dtype=float))
+    for row, prediction, probability in zip(rows, predictions, probabilities):
+        audit_trail.record({
+            'ts': timestamp,
+            'model': disease,
+            'model_version': version,
+            'source': source,
+            'features': dict(zip(feature_names, row.tolist())),
+            'prediction': int(prediction),
+            'probability': round(float(probability[1]), 4),
+            'latency_ms': latency_ms,
+            'batch_size': len(rows)
+        })
+
+class MissingFeaturesError(ValueError):
+    """A JSON input row lacks fields the model needs"""
+
+    def __init__(self, missing):
+        super().__init__(f"Missing features: {', '.join(missing)}")
+        self.missing = missing
+
+def input_fields(disease):
+    """Fields a {name: value} input must provide; diabetes takes the raw measurements only"""
+    return DIABETES_INPUT_FIELDS if disease == 'diabetes' else FEATURE_NAMES[disease]
+
+def feature_vector(disease, row):
+    """Convert a JSON row (list in model order, or {feature_name: value}) into a model input vector
+
+    Dict rows must provide every field in input_fields(disease); for diabetes
+    the engineered indicators are derived with diabetes_features(), exactly
+    as in the form route. A list of the 8 raw diabetes values is accepted too.
+    """
+    feature_names = FEATURE_NAMES[disease]
+    if isinstance(row, dict):
+        fields = input_fields(disease)
+        missing = [name for name in fields if row.get(name) in (None, '')]
+        if missing:
+            raise MissingFeaturesError(missing)
+        values = [float(row[name]) for name in fields]
+    else:
+        values = [float(v) for v in row]
+        if disease == 'diabetes' and len(values) == len(DIABETES_INPUT_FIELDS):
+            return diabetes_features(*values)
+        if len(values) != len(feature_names):
+            raise ValueError(f'Expected {len(feature_names)} features for {disease}, got {len(values)}')
+        return values
+    if disease == 'diabetes':
+        return diabetes_features(*values)
+    return values
+
+def predict_disease(disease, user_input, explain=False):
+    """Score one model input vector; shared by the JSON prediction APIs"""
+    model = models[disease]
+    started = time.perf_counter()
+    prediction = model.predict([user_input])
+    record_prediction_input(disease, user_input)
+    probability = model.predict_proba([user_input]) if hasattr(model, 'predict_proba') else [[0, 0]]
+    audit_predictions(disease, [user_input], prediction, probability, started, 'api')
+
+    result = {
+        'prediction': int(prediction[0]),
+        'probability': round(float(probability[0][1]), 4),
+        'confidence': round(float(np.max(probability)) * 100, 2)
+    }
+    if explain:
+        result['explanation'] = explain_prediction(disease, user_input)
+    return result
+
 # Health Advice Function
 def get_health_advice(disease, has_disease):
     advice = {
@@ -294,6 +748,197 @@ def get_health_advice(disease, has_disease):
     
     return advice
 
+# ===================== EMERGENCY FAST PATH =====================
+
+EMERGENCY_CONTACTS = {
+    "USA": {
+        "Emergency": "911",
+        "Suicide Prevention": "988",
+        "Poison Control": "1-800-222-1222",
+        "Domestic Violence": "1-800-799-7233"
+    },
+    "UK": {
+        "Emergency": "999 or 112",
+        "NHS Non-emergency": "111",
+        "Samaritans (Suicide Prevention)": "116 123"
+    },
+    "Canada": {
+        "Emergency": "911",
+        "Suicide Prevention": "1-833-456-4566",
+        "Poison Control": "1-844-764-7669"
+    }
+}
+
+EMERGENCY_SYMPTOMS = [
+    "Chest pain or pressure (especially radiating to arm, jaw, or back)",
+    "Difficulty breathing or shortness of breath",
+    "Severe bleeding that won't stop",
+    "Sudden weakness or numbness in face, arm, or leg (especially on one side)",
+    "Sudden confusion, trouble speaking, or understanding",
+    "Sudden trouble seeing in one or both eyes",
+    "Sudden severe headache with no known cause",
+    "Fainting or unconsciousness",
+    "Suicidal or homicidal thoughts",
+    "Severe burns",
+    "Choking",
+    "Seizures that last more than 5 minutes",
+    "Severe allergic reaction (difficulty breathing, swelling of face/throat)"
+]
+
+# Phrases (and common wordings) that trigger each emergency symptom above
+EMERGENCY_TRIGGERS = dict(zip(EMERGENCY_SYMPTOMS, [
+    ["chest pain", "chest pressure", "chest tightness", "tight chest", "crushing chest", "pain in my chest",
+     "pain in chest", "chest hurts", "heart attack", "pain radiating to my arm", "pain radiating to my jaw"],
+    ["difficulty breathing", "breathing difficulty", "trouble breathing", "shortness of breath", "short of breath", "cant breathe",
+     "cannot breathe", "cant breath", "struggling to breathe", "gasping for air", "not breathing",
+     "stopped breathing", "breathless"],
+    ["severe bleeding", "bleeding heavily", "heavy bleeding", "bleeding wont stop", "bleeding that wont stop",
+     "cant stop the bleeding", "cant stop bleeding", "losing a lot of blood", "vomiting blood", "coughing up blood"],
+    ["face drooping", "face is drooping", "drooping face", "sudden weakness", "sudden numbness",
+     "numbness on one side", "weakness on one side", "cant move my arm", "cant move my leg",
+     "having a stroke"],
+    ["sudden confusion", "slurred speech", "slurring words", "trouble speaking", "cant speak", "cant talk properly"],
+    ["sudden loss of vision", "suddenly cant see", "sudden blindness", "lost vision", "sudden vision loss"],
+    ["worst headache of my life", "sudden severe headache", "thunderclap headache", "worst headache ever"],
+    ["fainted", "fainting", "passed out", "unconscious", "unresponsive", "wont wake up", "collapsed"],
+    ["suicidal", "kill myself", "end my life", "want to die", "suicide", "hurt myself", "kill someone"],
+    ["severe burn", "severe burns", "badly burned", "third degree burn", "chemical burn"],
+    ["choking", "something stuck in my throat", "cant swallow and cant breathe"],
+    ["seizure", "seizures", "convulsions", "convulsing", "having a fit"],
+    ["anaphylaxis", "anaphylactic", "throat is closing", "throat closing", "throat swelling", "swollen throat",
+     "tongue swelling", "face swelling", "severe allergic reaction"]
+]))
+
+# Topic words that also appear in informational questions ("risk of a heart attack",
+# "seizure medication"); these are ignored when such context surrounds them
+EMERGENCY_TOPICS = [
+    "heart attack", "stroke", "suicide", "suicidal", "seizure", "seizures", "convulsions",
+    "anaphylaxis", "anaphylactic", "fainting", "unconscious", "choking", "severe allergic reaction"
+]
+
+emergency_matcher = EmergencyMatcher(EMERGENCY_TRIGGERS, topics=EMERGENCY_TOPICS)
+
+def emergency_response(user_message):
+    """Immediate emergency guidance if the message describes emergency symptoms, else None"""
+    matched = emergency_matcher.match(user_message)
+    if not matched:
+        return None
+    lines = [
+        "🚨 **These symptoms can be a medical emergency. Please seek help right now.**",
+        "",
+        "You mentioned:"
+    ]
+    lines += [f"• {symptom}" for symptom in matched]
+    lines += ["", "**Call your local emergency number immediately:**"]
+    lines += [
+        f"• {country}: {', '.join(f'{name} {number}' for name, number in contacts.items())}"
+        for country, contacts in EMERGENCY_CONTACTS.items()
+    ]
+    lines += [
+        "",
+        "Do not drive yourself. Stay with someone if you can, and follow the dispatcher's instructions."
+    ]
+    return {'text': '\n'.join(lines), 'matched': matched}
+
+# ===================== LOCAL KNOWLEDGE BASE =====================
+
+HEALTH_TIPS = {
+    "Nutrition": [
+        "Eat a variety of colorful fruits and vegetables daily",
+        "Choose whole grains over refined grains",
+        "Limit added sugars and saturated fats",
+        "Stay hydrated with water instead of sugary drinks",
+        "Practice portion control"
+    ],
+    "Exercise": [
+        "Aim for at least 150 minutes of moderate exercise per week",
+        "Include strength training twice a week",
+        "Take breaks from sitting every 30 minutes",
+        "Find activities you enjoy to stay consistent",
+        "Warm up before and cool down after exercise"
+    ],
+    "Mental Health": [
+        "Practice mindfulness or meditation daily",
+        "Maintain social connections",
+        "Get 7-9 hours of quality sleep per night",
+        "Set realistic goals and celebrate small wins",
+        "Seek professional help when needed"
+    ],
+    "Preventive Care": [
+        "Get regular health check-ups",
+        "Stay up to date on vaccinations",
+        "Know your family medical history",
+        "Don't ignore persistent symptoms",
+        "Follow screening guidelines for your age group"
+    ]
+}
+
+DISEASE_TERMS = {
+    'diabetes': ('Diabetes', 'diabetes diabetic blood sugar glucose insulin'),
+    'heart': ('Heart disease', 'heart disease cardiac cardiovascular cholesterol blood pressure'),
+    'kidney': ('Kidney disease', 'kidney disease renal ckd')
+}
+
+def knowledge_documents():
+    """Curated app content as retrieval documents"""
+    documents = []
+    for disease, (label, terms) in DISEASE_TERMS.items():
+        for has_disease, title, keywords in (
+            (True, f'Managing {label.lower()}', 'managing manage living with diagnosed have treatment care'),
+            (False, f'Preventing {label.lower()}', 'preventing prevent prevention avoid reduce risk healthy')
+        ):
+            advice = get_health_advice(disease, has_disease)
+            lines = [f'**{title}**', ''] + [f'• {tip}' for tip in advice['general_tips']]
+            if advice['doctor_visit']:
+                lines += ['', f"**When to see a doctor:** {advice['doctor_visit']}"]
+            if advice['resources']:
+                lines += ['', '**Resources:**'] + [f'• {resource}' for resource in advice['resources']]
+            documents.append({'id': f'advice:{disease}:{int(has_disease)}', 'title': title,
+                              'text': '\n'.join(lines), 'keywords': f'{terms} {keywords} tips advice'})
+
+    for category, tips in HEALTH_TIPS.items():
+        documents.append({'id': f'tips:{category}', 'title': f'{category} tips',
+                          'text': '\n'.join([f'**{category} tips**', ''] + [f'• {tip}' for tip in tips]),
+                          'keywords': 'healthy lifestyle advice'})
+
+    documents.append({
+        'id': 'emergency:symptoms',
+        'title': 'When to seek emergency care',
+        'text': '\n'.join(['**Seek emergency care right away for:**', '']
+                          + [f'• {symptom}' for symptom in EMERGENCY_SYMPTOMS]),
+        'keywords': 'emergency symptoms warning signs urgent call ambulance hospital er'
+    })
+    # One document for every country, so a generic question never returns a single country's list
+    lines = ['**Emergency numbers**']
+    for country, contacts in EMERGENCY_CONTACTS.items():
+        lines += ['', f'**{country}**'] + [f'• {name}: {number}' for name, number in contacts.items()]
+    documents.append({
+        'id': 'emergency:numbers',
+        'title': 'Emergency numbers',
+        'text': '\n'.join(lines),
+        'keywords': 'emergency number phone hotline call contact helpline '
+                    + ' '.join(EMERGENCY_CONTACTS).lower() + ' united states america britain england'
+    })
+
+    try:
+        documents += load_faq(app.config['FAQ_PATH'])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"✗ Could not load FAQ file {app.config['FAQ_PATH']}: {e}")
+    return documents
+
+knowledge_index = KnowledgeIndex(knowledge_documents())
+print(f"✓ Knowledge base indexed: {len(knowledge_index.documents)} documents")
+
+def local_answer(user_message):
+    """Answer from the curated knowledge base if it confidently covers the question, else None"""
+    if not app.config['RETRIEVAL_ENABLED']:
+        return None
+    hit = knowledge_index.answer(user_message, min_confidence=app.config['RETRIEVAL_MIN_CONFIDENCE'])
+    if hit is None:
+        return None
+    text = hit['document']['text'] + "\n\n_From AmarCare's health guides. This is general information, not a diagnosis._"
+    return {'text': text, 'document': hit['document']['id'], 'confidence': hit['confidence']}
+
 # ===================== CHATBOT ROUTES =====================
 
 @app.route('/chatbot_interface')
@@ -368,25 +1013,43 @@ def chatbot_test():
     </html>
     '''
 
+def emergency_reply(emergency):
+    """Chatbot body for an emergency hit, sent without waiting for the model
+
+    The client asks again with triage=skip to get the model's answer as a follow-up.
+    """
+    return {
+        'response': emergency['text'],
+        'type': 'emergency',
+        'emergency': emergency['matched'],
+        'follow_up': {'triage': 'skip'},
+        'has_file': False
+    }
+
+def log_chatbot(outcome, started, user_message, sample=True, **fields):
+    """Structured summary of one chatbot request; routine requests are sampled"""
+    log.info('chatbot_request', extra={'sample': sample, 'fields': {
+        'outcome': outcome,
+        'message_chars': len(user_message),
+        'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+        **fields
+    }})
+
 @app.route('/chatbot', methods=['POST'])
 def chatbot():
     """Enhanced chatbot endpoint with multimodal support - FIXED VERSION"""
+    started = time.perf_counter()
     try:
-        print(f"=== Chatbot Request Received ===")
-        print(f"Content-Type: {request.content_type}")
-        print(f"Method: {request.method}")
-        print(f"Has files: {'file' in request.files}")
-        print(f"Form data: {request.form}")
-        
         user_message = ""
         file = None
         file_path = None
         file_type = None
+        content_hash = None
+        skip_triage = False
         
         # Check content type and handle accordingly
         if request.content_type and 'application/json' in request.content_type:
             # Handle JSON request
-            print("Processing JSON request")
             data = request.get_json()
             if not data:
                 return jsonify({
@@ -396,34 +1059,50 @@ def chatbot():
                 }), 400
             
             user_message = data.get('message', '').strip()
-            print(f"JSON message: {user_message}")
+            skip_triage = data.get('triage') == 'skip'
             
         elif request.content_type and 'multipart/form-data' in request.content_type:
             # Handle form data with file upload
-            print("Processing form data with file upload")
             user_message = request.form.get('message', '').strip()
             file = request.files.get('file')
-            print(f"Form message: {user_message}")
-            print(f"File received: {file.filename if file else 'None'}")
+            skip_triage = request.form.get('triage') == 'skip'
             
         else:
             # Try to get message from form data
-            print("Trying form data")
             user_message = request.form.get('message', '').strip()
             file = request.files.get('file')
+            skip_triage = request.form.get('triage') == 'skip'
         
         # Validate input
         if not user_message and not file:
-            print("No message or file provided")
             return jsonify({
                 'response': 'Please enter a message or upload a file.',
                 'type': 'error',
                 'has_file': False
             }), 400
         
+        # Emergency symptoms get an immediate local answer instead of waiting for Gemini;
+        # the client fetches the model's answer afterwards with triage=skip
+        emergency = None if skip_triage else emergency_response(user_message)
+        if emergency:
+            log_chatbot('emergency', started, user_message, sample=False, matched=emergency['matched'])
+            return jsonify(emergency_reply(emergency))
+        
+        # Questions the curated content already answers skip the Gemini round trip
+        if not (file and file.filename):
+            local = local_answer(user_message)
+            if local:
+                log_chatbot('knowledge_base', started, user_message, document=local['document'],
+                            confidence=local['confidence'])
+                return jsonify({
+                    'response': local['text'],
+                    'type': 'success',
+                    'source': 'knowledge_base',
+                    'has_file': False
+                })
+        
         # Process uploaded file if exists
         if file and file.filename:
-            print(f"Processing file: {file.filename}")
             if not allowed_file(file.filename):
                 return jsonify({
                     'response': 'File type not allowed. Please upload PNG, JPG, JPEG, or PDF files only.',
@@ -431,9 +1110,11 @@ def chatbot():
                     'has_file': False
                 }), 400
             
-            filename = secure_filename(file.filename)
+            # Unique name so concurrent requests never share an upload
+            filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
+            # Hash while saving so repeated documents hit the analysis cache
+            content_hash, _ = save_and_hash(file.stream, file_path)
             file_type = file.content_type
             
             # Validate file size
@@ -446,32 +1127,27 @@ def chatbot():
                     'has_file': False
                 }), 400
         
-        print(f"Getting response from Gemini for: {user_message[:50]}...")
         # Get response from Gemini
-        bot_response = get_gemini_response(user_message, file_path, file_type)
-        print(f"Got response from Gemini: {bot_response[:50]}...")
+        bot_response = get_gemini_response(user_message, file_path, file_type, content_hash=content_hash)
         
         # Clean up uploaded file
         if file_path and os.path.exists(file_path):
             try:
                 os.remove(file_path)
-                print(f"Cleaned up file: {file_path}")
             except Exception as e:
-                print(f"Error cleaning up file: {e}")
+                log.warning('upload_cleanup_failed', extra={'fields': {'path': file_path, 'error': str(e)}})
         
         response_data = {
             'response': bot_response,
             'type': 'success',
             'has_file': bool(file)
         }
-        
-        print(f"Sending response: {response_data}")
+        log_chatbot('llm', started, user_message, file_type=file_type,
+                    file_bytes=file_size if file_path else 0, response_chars=len(bot_response))
         return jsonify(response_data)
         
     except Exception as e:
-        print(f"!!! Chatbot error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception('chatbot_error', extra={'fields': {'error': str(e)}})
         
         return jsonify({
             'response': f'An error occurred: {str(e)}',
@@ -479,6 +1155,100 @@ def chatbot():
             'has_file': False
         }), 500
 
+# ===================== ANALYSIS JOB API =====================
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a chatbot analysis and return its job id immediately"""
+    try:
+        if request.is_json:
+            data = request.get_json() or {}
+            user_message = data.get('message', '').strip()
+            file = None
+        else:
+            user_message = request.form.get('message', '').strip()
+            file = request.files.get('file')
+
+        if not user_message and not (file and file.filename):
+            return jsonify({'success': False, 'error': 'Please enter a message or upload a file.'}), 400
+
+        payload = {'message': user_message, 'file_path': None, 'file_type': None, 'content_hash': None}
+        if file and file.filename:
+            if not allowed_file(file.filename):
+                return jsonify({
+                    'success': False,
+                    'error': 'File type not allowed. Please upload PNG, JPG, JPEG, or PDF files only.'
+                }), 400
+            # Unique name so concurrent jobs never share an upload
+            filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
+            file_path = os.path.join(app.config['UPLOAD_FOLDER'], 'jobs', filename)
+            payload['content_hash'], _ = save_and_hash(file.stream, file_path)
+            payload['file_path'] = file_path
+            payload['file_type'] = file.content_type
+
+        job_queue.start()
+        job_id = job_queue.submit('analysis', payload)
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('job_status', job_id=job_id),
+            'events_url': url_for('job_events', job_id=job_id)
+        }), 202
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Poll a job's status and, once finished, its result"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found or expired'}), 404
+    return jsonify({'success': True, **job})
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    if job_queue.get(job_id) is None:
+        return jsonify({'success': False, 'error': 'Job not found or expired'}), 404
+    if not job_queue.cancel(job_id):
+        return jsonify({'success': False, 'error': 'Job has already finished'}), 409
+    return jsonify({'success': True, 'job_id': job_id, 'status': 'cancelled'})
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events stream of a job's status, for at most JOB_EVENTS_MAX_SECONDS
+
+    Polling /api/jobs/<id> is the primary interface; a stream that times out
+    ends with a 'timeout' event and EventSource clients reconnect after the
+    retry interval.
+    """
+    if job_queue.get(job_id) is None:
+        return jsonify({'success': False, 'error': 'Job not found or expired'}), 404
+
+    deadline = time.monotonic() + app.config['JOB_EVENTS_MAX_SECONDS']
+
+    def generate():
+        yield "retry: 5000\n\n"
+        last_status = None
+        while True:
+            job = job_queue.get(job_id)
+            if job is None:
+                yield "event: expired\ndata: {}\n\n"
+                return
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield f"data: {json.dumps(job)}\n\n"
+            if job['status'] in FINISHED_STATES:
+                return
+            if time.monotonic() >= deadline:
+                yield f"event: timeout\ndata: {json.dumps({'status': job['status']})}\n\n"
+                return
+            time.sleep(1)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # ===================== DOCTOR FINDER API =====================
 
 @app.route('/api/nearby-doctors', methods=['POST'])
@@ -541,80 +1311,14 @@ def about():
 @app.route('/emergency_info')
 def emergency_info():
     """Emergency information page"""
-    emergency_contacts = {
-        "USA": {
-            "Emergency": "911",
-            "Suicide Prevention": "988",
-            "Poison Control": "1-800-222-1222",
-            "Domestic Violence": "1-800-799-7233"
-        },
-        "UK": {
-            "Emergency": "999 or 112",
-            "NHS Non-emergency": "111",
-            "Samaritans (Suicide Prevention)": "116 123"
-        },
-        "Canada": {
-            "Emergency": "911",
-            "Suicide Prevention": "1-833-456-4566",
-            "Poison Control": "1-844-764-7669"
-        }
-    }
-    
-    emergency_symptoms = [
-        "Chest pain or pressure (especially radiating to arm, jaw, or back)",
-        "Difficulty breathing or shortness of breath",
-        "Severe bleeding that won't stop",
-        "Sudden weakness or numbness in face, arm, or leg (especially on one side)",
-        "Sudden confusion, trouble speaking, or understanding",
-        "Sudden trouble seeing in one or both eyes",
-        "Sudden severe headache with no known cause",
-        "Fainting or unconsciousness",
-        "Suicidal or homicidal thoughts",
-        "Severe burns",
-        "Choking",
-        "Seizures that last more than 5 minutes",
-        "Severe allergic reaction (difficulty breathing, swelling of face/throat)"
-    ]
-    
     return render_template('emergency.html',
-                         emergency_contacts=emergency_contacts,
-                         emergency_symptoms=emergency_symptoms)
+                         emergency_contacts=EMERGENCY_CONTACTS,
+                         emergency_symptoms=EMERGENCY_SYMPTOMS)
 
 @app.route('/health_tips')
 def health_tips():
     """General health tips page"""
-    tips_by_category = {
-        "Nutrition": [
-            "Eat a variety of colorful fruits and vegetables daily",
-            "Choose whole grains over refined grains",
-            "Limit added sugars and saturated fats",
-            "Stay hydrated with water instead of sugary drinks",
-            "Practice portion control"
-        ],
-        "Exercise": [
-            "Aim for at least 150 minutes of moderate exercise per week",
-            "Include strength training twice a week",
-            "Take breaks from sitting every 30 minutes",
-            "Find activities you enjoy to stay consistent",
-            "Warm up before and cool down after exercise"
-        ],
-        "Mental Health": [
-            "Practice mindfulness or meditation daily",
-            "Maintain social connections",
-            "Get 7-9 hours of quality sleep per night",
-            "Set realistic goals and celebrate small wins",
-            "Seek professional help when needed"
-        ],
-        "Preventive Care": [
-            "Get regular health check-ups",
-            "Stay up to date on vaccinations",
-            "Know your family medical history",
-            "Don't ignore persistent symptoms",
-            "Follow screening guidelines for your age group"
-        ]
-    }
-    
-    return render_template('health_tips.html', tips_by_category=tips_by_category)
+    return render_template('health_tips.html', tips_by_category=HEALTH_TIPS)
 
 # ===================== DISEASE PREDICTION ROUTES =====================
 
@@ -635,42 +1339,21 @@ def diabetes():
                 flash("Please enter valid values for pregnancies (0-20) and age (0-120)", 'warning')
                 return redirect(url_for('diabetes'))
             
-            # BMI categories
-            new_bmi_underweight = 1 if bmi <= 18.5 else 0
-            new_bmi_overweight = 1 if 24.9 < bmi <= 29.9 else 0
-            new_bmi_obesity_1 = 1 if 29.9 < bmi <= 34.9 else 0
-            new_bmi_obesity_2 = 1 if 34.9 < bmi <= 39.9 else 0
-            new_bmi_obesity_3 = 1 if bmi > 39.9 else 0
-            
-            # Insulin categories
-            new_insulin_normal = 1 if 16 <= insulin <= 166 else 0
-            
-            # Glucose categories
-            if glucose <= 70:
-                new_glucose_low, new_glucose_normal, new_glucose_overweight, new_glucose_secret = 1, 0, 0, 0
-            elif 70 < glucose <= 99:
-                new_glucose_low, new_glucose_normal, new_glucose_overweight, new_glucose_secret = 0, 1, 0, 0
-            elif 99 < glucose <= 126:
-                new_glucose_low, new_glucose_normal, new_glucose_overweight, new_glucose_secret = 0, 0, 1, 0
-            else:
-                new_glucose_low, new_glucose_normal, new_glucose_overweight, new_glucose_secret = 0, 0, 0, 1
-            
-            user_input = [
-                pregnancies, glucose, blood_pressure, skin_thickness, insulin,
-                bmi, diabetes_pedigree, age, new_bmi_underweight,
-                new_bmi_overweight, new_bmi_obesity_1, new_bmi_obesity_2,
-                new_bmi_obesity_3, new_insulin_normal, new_glucose_low,
-                new_glucose_normal, new_glucose_overweight, new_glucose_secret
-            ]
+            user_input = diabetes_features(pregnancies, glucose, blood_pressure, skin_thickness,
+                                           insulin, bmi, diabetes_pedigree, age)
             
+            started = time.perf_counter()
             prediction = models['diabetes'].predict([user_input])
+            record_prediction_input('diabetes', user_input)
             result = "The person is predicted to have diabetes" if prediction[0] == 1 else "The person is predicted to not have diabetes"
             
             probability = models['diabetes'].predict_proba([user_input]) if hasattr(models['diabetes'], 'predict_proba') else [[0, 0]]
+            audit_predictions('diabetes', [user_input], prediction, probability, started, 'form')
             confidence = round(np.max(probability) * 100, 2)
             
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             health_advice = get_health_advice("diabetes", prediction[0] == 1)
+            explanation = explain_prediction("diabetes", user_input) if request.form.get('explain') else None
             
             return render_template('diabetes.html', 
                                 result=result, 
@@ -678,6 +1361,7 @@ def diabetes():
                                 current_time=current_time,
                                 show_result=True,
                                 health_advice=health_advice,
+                                explanation=explanation,
                                 disease_type="diabetes")
         
         except ValueError as ve:
@@ -714,14 +1398,18 @@ def heart():
             user_input = [age, sex, cp, trestbps, chol, fbs, restecg, thalach, 
                          exang, oldpeak, slope, ca, thal]
             
+            started = time.perf_counter()
             prediction = models['heart'].predict([user_input])
+            record_prediction_input('heart', user_input)
             result = "This person is predicted to have heart disease" if prediction[0] == 1 else "This person is predicted to not have heart disease"
             
             probability = models['heart'].predict_proba([user_input]) if hasattr(models['heart'], 'predict_proba') else [[0, 0]]
+            audit_predictions('heart', [user_input], prediction, probability, started, 'form')
             confidence = round(np.max(probability) * 100, 2)
             
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             health_advice = get_health_advice("heart", prediction[0] == 1)
+            explanation = explain_prediction("heart", user_input) if request.form.get('explain') else None
             
             return render_template('heart.html', 
                                  result=result, 
@@ -729,6 +1417,7 @@ def heart():
                                  current_time=current_time,
                                  show_result=True,
                                  health_advice=health_advice,
+                                 explanation=explanation,
                                  disease_type="heart")
         
         except ValueError as ve:
@@ -783,14 +1472,18 @@ def kidney():
                 peda_edema, aanemia
             ]
             
+            started = time.perf_counter()
             prediction = models['kidney'].predict([user_input])
+            record_prediction_input('kidney', user_input)
             result = "The person is predicted to have kidney disease" if prediction[0] == 1 else "The person is predicted to not have kidney disease"
             
             probability = models['kidney'].predict_proba([user_input]) if hasattr(models['kidney'], 'predict_proba') else [[0, 0]]
+            audit_predictions('kidney', [user_input], prediction, probability, started, 'form')
             confidence = round(np.max(probability) * 100, 2)
             
             current_time = datetime.now().strftime("%Y-%m-d %H:%M:%S")
             health_advice = get_health_advice("kidney", prediction[0] == 1)
+            explanation = explain_prediction("kidney", user_input) if request.form.get('explain') else None
             
             return render_template('kidney.html', 
                                 result=result, 
@@ -798,6 +1491,7 @@ def kidney():
                                 current_time=current_time,
                                 show_result=True,
                                 health_advice=health_advice,
+                                explanation=explanation,
                                 disease_type="kidney")
         
         except ValueError as ve:
@@ -809,23 +1503,341 @@ def kidney():
     
     return render_template('kidney.html', show_result=False)
 
+@app.route('/api/explain/<disease>', methods=['POST'])
+def explain_batch(disease):
+    """Predict and explain a batch of feature vectors for one model"""
+    if disease not in FEATURE_NAMES:
+        return jsonify({'success': False, 'error': f'Unknown model: {disease}'}), 404
+    if disease not in explainers:
+        return jsonify({'success': False, 'error': 'Explanations are not available for this model'}), 503
+
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get('rows'), list):
+            return jsonify({
+                'success': False,
+                'error': "Expected a JSON object with a 'rows' list",
+                'feature_names': FEATURE_NAMES[disease]
+            }), 400
+        rows = data['rows']
+        feature_names = FEATURE_NAMES[disease]
+        top_k = min(max(int(data.get('top_k', 5)), 1), len(feature_names))
+
+        if len(rows) > app.config['EXPLAIN_MAX_ROWS']:
+            return jsonify({
+                'success': False,
+                'error': f"At most {app.config['EXPLAIN_MAX_ROWS']} rows per request"
+            }), 400
+
+        # Rows may be given in model order or as {feature_name: value} objects
+        X = []
+        for i, row in enumerate(rows):
+            try:
+                X.append(feature_vector(disease, row))
+            except MissingFeaturesError as e:
+                return jsonify({
+                    'success': False,
+                    'error': f'Row {i}: {e}',
+                    'row': i,
+                    'missing': e.missing,
+                    'required': input_fields(disease)
+                }), 400
+        X = np.array(X, dtype=float)
+        if X.ndim != 2 or X.shape[0] == 0:
+            return jsonify({
+                'success': False,
+                'error': f'Expected a non-empty list of rows with {len(feature_names)} features',
+                'feature_names': feature_names
+            }), 400
+
+        started = time.perf_counter()
+        probabilities = models[disease].predict_proba(X)
+        record_prediction_input(disease, X)
+        audit_predictions(disease, X, np.argmax(probabilities, axis=1), probabilities, started, 'explain')
+        explanations = explainers[disease].explain(X, top_k=top_k)
+
+        return jsonify({
+            'success': True,
+            'model': disease,
+            'results': [
+                {
+                    'prediction': int(np.argmax(probability)),
+                    'probability': round(float(probability[1]), 4),
+                    'explanation': explanation
+                }
+                for probability, explanation in zip(probabilities, explanations)
+            ]
+        })
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'Invalid input: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# ===================== MULTI-DISEASE SCREENING =====================
+
+# Fields a patient record may share across models, and the record keys each
+# model feature is read from (first present wins). Any other feature is read
+# from the record under its own model feature name.
+SCREENING_SHARED_FIELDS = {
+    'diabetes': {
+        'age': ['age'],
+        'blood_pressure': ['blood_pressure', 'diastolic_bp'],
+        'glucose': ['glucose']
+    },
+    'heart': {
+        'age': ['age'],
+        'trestbps': ['trestbps', 'systolic_bp'],
+        'chol': ['chol', 'cholesterol']
+    },
+    'kidney': {
+        'age': ['age'],
+        'blood_pressure': ['blood_pressure', 'diastolic_bp'],
+        'blood_glucose_random': ['blood_glucose_random', 'glucose']
+    }
+}
+
+# Same bounds the prediction forms enforce
+SCREENING_LIMITS = {
+    'diabetes': {'pregnancies': (0, 20), 'age': (0, 120)},
+    'heart': {'cp': (0, 3), 'fbs': (0, 1), 'restecg': (0, 2)},
+    'kidney': {name: (0, 1) for name in ['hypertension', 'diabetes_mellitus', 'coronary_artery_disease',
+                                         'appetite', 'peda_edema', 'aanemia']}
+}
+
+SCREENING_RESULTS = {
+    'diabetes': ("The person is predicted to have diabetes", "The person is predicted to not have diabetes"),
+    'heart': ("This person is predicted to have heart disease", "This person is predicted to not have heart disease"),
+    'kidney': ("The person is predicted to have kidney disease", "The person is predicted to not have kidney disease")
+}
+
+SPECIALISTS = {'diabetes': 'Endocrinologist', 'heart': 'Cardiologist', 'kidney': 'Nephrologist'}
+
+_screening_pool = None
+_screening_pool_pid = None
+_screening_pool_lock = threading.Lock()
+
+def screening_pool():
+    """Thread pool for concurrent model scoring, created per process (fork-safe)"""
+    global _screening_pool, _screening_pool_pid
+    with _screening_pool_lock:
+        if _screening_pool is None or _screening_pool_pid != os.getpid():
+            _screening_pool = ThreadPoolExecutor(max_workers=app.config['SCREENING_WORKERS'],
+                                                 thread_name_prefix='screening')
+            _screening_pool_pid = os.getpid()
+        return _screening_pool
+
+def screening_input(disease, record):
+    """Map a patient record onto one model's input vector
+
+    Returns (user_input, missing_fields, error); user_input is None when the
+    record lacks fields this model needs or holds out-of-range values.
+    """
+    raw = {}
+    missing = []
+    shared = SCREENING_SHARED_FIELDS[disease]
+    required = input_fields(disease)
+
+    for name in required:
+        key = next((k for k in shared.get(name, [name]) if record.get(k) not in (None, '')), None)
+        if key is None:
+            missing.append(shared.get(name, [name])[0])
+            continue
+        try:
+            raw[name] = float(record[key])
+        except (TypeError, ValueError):
+            return None, [], f"Invalid value for {key}: {record[key]!r}"
+
+    if missing:
+        return None, missing, None
+
+    for name, (lo, hi) in SCREENING_LIMITS[disease].items():
+        if not (lo <= raw[name] <= hi):
+            return None, [], f"{name} must be between {lo} and {hi}"
+
+    if disease == 'diabetes':
+        return diabetes_features(**raw), [], None
+    return [raw[name] for name in FEATURE_NAMES[disease]], [], None
+
+def score_batch(disease, X, explain=False):
+    """Score a matrix of model inputs; runs on the screening pool"""
+    model = models[disease]
+    started = time.perf_counter()
+    if hasattr(model, 'predict_proba'):
+        probabilities = np.asarray(model.predict_proba(X), dtype=float)
+    else:
+        probabilities = np.zeros((len(X), 2))
+    predictions = np.asarray(model.predict(X)).reshape(-1)
+    record_prediction_input(disease, X)
+    audit_predictions(disease, X, predictions, probabilities, started, 'screening')
+    explanations = None
+    if explain and disease in explainers:
+        explanations = explainers[disease].explain(X)
+    return predictions, probabilities, explanations
+
+def risk_level(probability):
+    """Bucket a disease probability for the combined report"""
+    if probability >= 0.7:
+        return 'high'
+    if probability >= 0.4:
+        return 'moderate'
+    return 'low'
+
+def screen_patients(records, explain=False):
+    """Score every patient against all three models; one pool task per model"""
+    reports = [{'results': {}} for _ in records]
+    batches = {}
+
+    for disease in FEATURE_NAMES:
+        rows = []
+        for i, record in enumerate(records):
+            user_input, missing, error = screening_input(disease, record)
+            if error:
+                reports[i]['results'][disease] = {'status': 'invalid', 'error': error}
+            elif missing:
+                reports[i]['results'][disease] = {'status': 'insufficient_data', 'missing_fields': missing}
+            else:
+                rows.append((i, user_input))
+        if rows:
+            X = np.array([user_input for _, user_input in rows], dtype=float)
+            batches[disease] = (rows, screening_pool().submit(score_batch, disease, X, explain))
+
+    for disease, (rows, future) in batches.items():
+        predictions, probabilities, explanations = future.result()
+        positive, negative = SCREENING_RESULTS[disease]
+        for j, (i, _) in enumerate(rows):
+            has_disease = int(predictions[j]) == 1
+            probability = float(probabilities[j][1])
+            result = {
+                'status': 'scored',
+                'prediction': int(predictions[j]),
+                'result': positive if has_disease else negative,
+                'probability': round(probability, 4),
+                'confidence': round(float(np.max(probabilities[j])) * 100, 2),
+                'risk_level': risk_level(probability),
+                'health_advice': get_health_advice(disease, has_disease)
+            }
+            if explanations is not None:
+                result['explanation'] = explanations[j]
+            reports[i]['results'][disease] = result
+
+    for report in reports:
+        scored = {d: r for d, r in report['results'].items() if r['status'] == 'scored'}
+        flagged = [d for d, r in scored.items() if r['prediction'] == 1]
+        report['summary'] = {
+            'models_scored': sorted(scored),
+            'conditions_flagged': flagged,
+            'highest_risk': max(scored, key=lambda d: scored[d]['probability']) if scored else None,
+            'recommended_specialists': [SPECIALISTS[d] for d in flagged]
+        }
+    return reports
+
+@app.route('/api/screening', methods=['POST'])
+def screening():
+    """Screen one patient record (or a batch) for diabetes, heart and kidney disease"""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'error': 'Please provide a patient record in JSON format.'}), 400
+
+        batch = 'patients' in data
+        records = data['patients'] if batch else [data.get('patient', data)]
+        if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+            return jsonify({'success': False, 'error': 'Expected a patient object or a non-empty list of patients'}), 400
+        if len(records) > app.config['SCREENING_MAX_PATIENTS']:
+            return jsonify({
+                'success': False,
+                'error': f"At most {app.config['SCREENING_MAX_PATIENTS']} patients per request"
+            }), 413
+
+        reports = screen_patients(records, explain=bool(data.get('explain')))
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if batch:
+            return jsonify({'success': True, 'screened_at': current_time, 'patients': reports})
+        return jsonify({'success': True, 'screened_at': current_time, **reports[0]})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # ===================== UTILITY ROUTES =====================
 
-# @app.route('/api/status')
-# def api_status():
-#     """Check API and model status"""
-#     status = {
-#         "flask_app": "running",
-#         "gemini_api": "configured" if gemini_models['chat'] else "not_configured",
-#         "ml_models": {
-#             "diabetes": "loaded" if 'diabetes' in models else "error",
-#             "heart": "loaded" if 'heart' in models else "error",
-#             "kidney": "loaded" if 'kidney' in models else "error"
-#         },
-#         "upload_folder": "exists" if os.path.exists(app.config['UPLOAD_FOLDER']) else "missing",
-#         "timestamp": datetime.now().isoformat()
-#     }
-#     return jsonify(status)
+@app.route('/api/drift')
+@app.route('/api/drift/<disease>')
+def drift_status(disease=None):
+    """Input-drift statistics against the training datasets (this worker's share of traffic)"""
+    if disease is not None:
+        if disease not in drift_monitors:
+            return jsonify({'success': False, 'error': f'No drift monitor for: {disease}'}), 404
+        return jsonify({'success': True, 'pid': os.getpid(), 'model': disease,
+                        **drift_monitors[disease].snapshot()})
+    return jsonify({
+        'success': True,
+        'pid': os.getpid(),
+        'models': {name: monitor.snapshot() for name, monitor in drift_monitors.items()}
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics for this worker process; series are labelled with its pid"""
+    lines = prometheus_lines({name: monitor.snapshot() for name, monitor in drift_monitors.items()})
+    lines += usage_prometheus_lines(llm_usage.totals())
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/llm-usage')
+def llm_usage_summary():
+    """LLM calls, tokens and latency per model and request type over rolling windows"""
+    return jsonify({'success': True, 'pid': os.getpid(), 'windows': llm_usage.summary()})
+
+@app.route('/api/status')
+def api_status():
+    """Check API and model status"""
+    status = service_status()
+    status.update({
+        "flask_app": "running",
+        "upload_folder": "exists" if os.path.exists(app.config['UPLOAD_FOLDER']) else "missing",
+        "jobs": job_queue.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "audit": {"enabled": audit_trail is not None, "dropped": audit_trail.dropped if audit_trail else 0},
+        "timestamp": datetime.now().isoformat()
+    })
+    return jsonify(status)
+
+def profiles_authorized():
+    """Captured profiles are only served to holders of the admin token"""
+    return profiler is not None and profiler.is_admin(request.headers.get('X-Profile-Token'))
+
+@app.route('/api/profiles')
+def profiles_index():
+    """Recent request profiles, newest first"""
+    if not profiles_authorized():
+        return jsonify({'success': False, 'error': 'Profiling is disabled or token is invalid'}), 403
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({'success': True, 'profiles': list_profiles(app.config['PROFILE_DIR'], limit)})
+
+@app.route('/api/profiles/<profile_id>')
+def profile_detail(profile_id):
+    """Summary of one capture, or the raw .prof file with ?format=prof"""
+    if not profiles_authorized():
+        return jsonify({'success': False, 'error': 'Profiling is disabled or token is invalid'}), 403
+    profile_id = secure_filename(profile_id)
+    fmt = 'prof' if request.args.get('format') == 'prof' else 'json'
+    path = os.path.abspath(os.path.join(app.config['PROFILE_DIR'], f'{profile_id}.{fmt}'))
+    if not profile_id or not os.path.exists(path):
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    if fmt == 'prof':
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f'{profile_id}.prof')
+    with open(path) as f:
+        return jsonify({'success': True, 'profile': json.load(f)})
+
+@app.route('/health/live')
+def health_live():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'alive', 'pid': os.getpid()})
+
+@app.route('/health/ready')
+def health_ready():
+    """Readiness probe: models loaded and warmed up in this worker"""
+    status = service_status()
+    return jsonify(status), 200 if status['ready'] else 503
 
 # ===================== ERROR HANDLERS =====================
 
@@ -887,9 +1899,20 @@ if __name__ == '__main__':
     print("  /diabetes             - Diabetes prediction")
     print("  /heart                - Heart disease prediction")
     print("  /kidney               - Kidney disease prediction")
+    print("  /api/explain/<model>  - Batch predictions with explanations")
+    print("  /api/screening        - Combined multi-disease screening")
+    print("  /api/jobs             - Background document/image analysis")
+    print("  /api/drift            - Input drift statistics")
+    print("  /metrics              - Prometheus metrics")
+    print("  /api/llm-usage        - LLM token and latency summary")
+    print("  /api/profiles         - Captured request profiles (admin token)")
+    print("  /health/live          - Liveness probe")
+    print("  /health/ready         - Readiness probe")
     print("  /api/status           - API status check")
     print("=" * 60)
     
+    warm_up()
+    
     # Run the application
     app.run(
         debug=True,
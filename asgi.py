@@ -0,0 +1,322 @@
+"""
+ASGI entry point for high-concurrency chat and prediction serving.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+The chatbot (plain and streaming) and JSON prediction APIs are served by async
+handlers that call Gemini through the SDK's async client, so waiting on the
+LLM no longer ties up a thread per request. Models, prompts and error messages
+come from app.py; every other route (pages, jobs, drift, metrics) is served by
+the Flask app mounted underneath.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from werkzeug.utils import secure_filename
+
+from cache import CHUNK_SIZE
+
+from app import (
+    app as flask_app,
+    gemini_client,
+    analysis_cache,
+    analysis_cache_key,
+    allowed_file,
+    build_gemini_request,
+    emergency_response,
+    local_answer,
+    log_chatbot,
+    emergency_reply,
+    log,
+    gemini_request_kind,
+    gemini_error_message,
+    record_llm_usage,
+    UnreadablePDFError,
+    GEMINI_UNAVAILABLE_MESSAGE,
+    UNREADABLE_PDF_MESSAGE,
+    FEATURE_NAMES,
+    feature_vector,
+    input_fields,
+    MissingFeaturesError,
+    predict_disease,
+    service_state,
+    warm_up,
+)
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    # Under the prefork runner the worker has already warmed up in post_worker_init
+    if not service_state['ready']:
+        await run_in_threadpool(warm_up)
+    yield
+
+
+app = FastAPI(title="HealthAI Assistant", docs_url="/api/docs", openapi_url="/api/openapi.json",
+              lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+class ChatRequestError(Exception):
+    """Invalid chatbot request; message is returned to the user"""
+
+
+# ===================== ASYNC LLM CLIENT =====================
+
+async def get_gemini_response_async(user_message, file_path=None, file_type=None, content_hash=None):
+    """Async counterpart of app.get_gemini_response"""
+    cache_key = analysis_cache_key(user_message, file_path, file_type, content_hash)
+    if cache_key:
+        cached = await run_in_threadpool(analysis_cache.get, cache_key)
+        if cached is not None:
+            return cached
+
+    if not gemini_client:
+        return GEMINI_UNAVAILABLE_MESSAGE
+
+    kind = gemini_request_kind(file_path, file_type)
+    try:
+        # PDF extraction and image decoding are blocking; keep them off the event loop
+        model, contents, footer = await run_in_threadpool(
+            build_gemini_request, user_message, file_path, file_type, content_hash)
+        started = time.perf_counter()
+        try:
+            response = await gemini_client.aio.models.generate_content(model=model, contents=contents)
+        except Exception:
+            record_llm_usage(model, kind, contents, file_path, started, error=True)
+            raise
+        record_llm_usage(model, kind, contents, file_path, started, usage=response.usage_metadata)
+        result = response.text + footer
+        if cache_key:
+            await run_in_threadpool(analysis_cache.put, cache_key, result)
+        return result
+    except UnreadablePDFError:
+        return UNREADABLE_PDF_MESSAGE
+    except Exception as e:
+        log.exception('gemini_error', extra={'fields': {'request_type': kind, 'error_type': type(e).__name__}})
+        return gemini_error_message(kind, e)
+
+
+async def stream_gemini_response(user_message, file_path=None, file_type=None, content_hash=None):
+    """Yield response text chunks as Gemini produces them"""
+    cache_key = analysis_cache_key(user_message, file_path, file_type, content_hash)
+    if cache_key:
+        cached = await run_in_threadpool(analysis_cache.get, cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    if not gemini_client:
+        yield GEMINI_UNAVAILABLE_MESSAGE
+        return
+
+    kind = gemini_request_kind(file_path, file_type)
+    try:
+        model, contents, footer = await run_in_threadpool(
+            build_gemini_request, user_message, file_path, file_type, content_hash)
+        started = time.perf_counter()
+        first_byte = None
+        usage = None
+        parts = []
+        try:
+            stream = await gemini_client.aio.models.generate_content_stream(model=model, contents=contents)
+            async for chunk in stream:
+                first_byte = first_byte or time.perf_counter()
+                # Token counts arrive with the stream's final chunk
+                usage = chunk.usage_metadata or usage
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+        except Exception:
+            record_llm_usage(model, kind, contents, file_path, started, first_byte, usage, error=True)
+            raise
+        record_llm_usage(model, kind, contents, file_path, started, first_byte, usage)
+        if footer:
+            parts.append(footer)
+            yield footer
+        # Only a stream that completed without error is cached
+        if cache_key:
+            await run_in_threadpool(analysis_cache.put, cache_key, ''.join(parts))
+    except UnreadablePDFError:
+        yield UNREADABLE_PDF_MESSAGE
+    except Exception as e:
+        log.exception('gemini_stream_error', extra={'fields': {'request_type': kind, 'error_type': type(e).__name__}})
+        yield gemini_error_message(kind, e)
+
+
+# ===================== CHATBOT ROUTES =====================
+
+async def read_chat_request(request):
+    """Return (message, file_path, file_type, content_hash, skip_triage) from a JSON or multipart chatbot request"""
+    content_type = request.headers.get('content-type', '')
+    file_path = None
+    file_type = None
+    content_hash = None
+
+    if 'application/json' in content_type:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            raise ChatRequestError('Please provide a message in JSON format.')
+        return str(data.get('message', '')).strip(), None, None, None, data.get('triage') == 'skip'
+
+    form = await request.form()
+    user_message = str(form.get('message', '')).strip()
+    skip_triage = form.get('triage') == 'skip'
+    upload = form.get('file')
+
+    if upload is not None and getattr(upload, 'filename', None):
+        if not allowed_file(upload.filename):
+            raise ChatRequestError('File type not allowed. Please upload PNG, JPG, JPEG, or PDF files only.')
+
+        # Unique name so concurrent requests never share an upload
+        filename = f"{uuid.uuid4().hex}_{secure_filename(upload.filename)}"
+        file_path = os.path.join(flask_app.config['UPLOAD_FOLDER'], filename)
+        max_size = flask_app.config['MAX_CONTENT_LENGTH']
+
+        # Hash while saving so repeated documents hit the analysis cache
+        digest = hashlib.sha256()
+        size = 0
+        with open(file_path, 'wb') as f:
+            while chunk := await upload.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    break
+                digest.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+        if size > max_size:
+            await run_in_threadpool(_remove_file, file_path)
+            raise ChatRequestError(f'File too large. Maximum size is {max_size // 1048576}MB.')
+        file_type = upload.content_type
+        content_hash = digest.hexdigest()
+    elif not user_message:
+        raise ChatRequestError('Please enter a message or upload a file.')
+
+    return user_message, file_path, file_type, content_hash, skip_triage
+
+
+def _remove_file(path):
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            log.warning('upload_cleanup_failed', extra={'fields': {'path': path, 'error': str(e)}})
+
+
+def _chat_error(message, status_code):
+    return JSONResponse({'response': message, 'type': 'error', 'has_file': False}, status_code=status_code)
+
+
+@app.post('/chatbot')
+async def chatbot(request: Request):
+    """Async chatbot endpoint; same request and response format as the Flask route"""
+    started = time.perf_counter()
+    try:
+        user_message, file_path, file_type, content_hash, skip_triage = await read_chat_request(request)
+    except ChatRequestError as e:
+        return _chat_error(str(e), 400)
+    if not user_message and not file_path:
+        return _chat_error('Please enter a message or upload a file.', 400)
+
+    # Answered at once; the model's answer is a follow-up request with triage=skip
+    emergency = None if skip_triage else emergency_response(user_message)
+    if emergency:
+        await run_in_threadpool(_remove_file, file_path)
+        log_chatbot('emergency', started, user_message, sample=False, matched=emergency['matched'])
+        return emergency_reply(emergency)
+
+    local = None if file_path else local_answer(user_message)
+    if local:
+        log_chatbot('knowledge_base', started, user_message, document=local['document'],
+                    confidence=local['confidence'])
+        return {'response': local['text'], 'type': 'success', 'source': 'knowledge_base', 'has_file': False}
+
+    try:
+        bot_response = await get_gemini_response_async(user_message, file_path, file_type, content_hash)
+    finally:
+        await run_in_threadpool(_remove_file, file_path)
+
+    log_chatbot('llm', started, user_message, file_type=file_type, response_chars=len(bot_response))
+    return {'response': bot_response, 'type': 'success', 'has_file': bool(file_path)}
+
+
+@app.post('/chatbot/stream')
+async def chatbot_stream(request: Request):
+    """Stream the chatbot answer as server-sent events"""
+    try:
+        user_message, file_path, file_type, content_hash, skip_triage = await read_chat_request(request)
+    except ChatRequestError as e:
+        return _chat_error(str(e), 400)
+    if not user_message and not file_path:
+        return _chat_error('Please enter a message or upload a file.', 400)
+
+    emergency = None if skip_triage else emergency_response(user_message)
+    local = None if file_path else local_answer(user_message)
+
+    async def events():
+        try:
+            # Emergency guidance goes out first, before the LLM has produced anything
+            if emergency:
+                notice = {'text': emergency['text'] + '\n\n', 'emergency': emergency['matched']}
+                yield f"data: {json.dumps(notice)}\n\n"
+            if local:
+                yield f"data: {json.dumps({'text': local['text'], 'source': 'knowledge_base'})}\n\n"
+            else:
+                async for text in stream_gemini_response(user_message, file_path, file_type, content_hash):
+                    yield f"data: {json.dumps({'text': text})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'has_file': bool(file_path)})}\n\n"
+        finally:
+            await run_in_threadpool(_remove_file, file_path)
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# ===================== PREDICTION API =====================
+
+@app.post('/api/predict/{disease}')
+async def predict(disease: str, request: Request):
+    """Score one model input given as {'features': [...] or {...}, 'explain': bool}"""
+    if disease not in FEATURE_NAMES:
+        return JSONResponse({'success': False, 'error': f'Unknown model: {disease}'}, status_code=404)
+
+    try:
+        data = await request.json()
+        user_input = feature_vector(disease, data.get('features', {}))
+    except MissingFeaturesError as e:
+        return JSONResponse({
+            'success': False,
+            'error': str(e),
+            'missing': e.missing,
+            'required': input_fields(disease)
+        }, status_code=400)
+    except (AttributeError, TypeError, ValueError) as e:
+        return JSONResponse({
+            'success': False,
+            'error': f'Invalid input: {str(e)}',
+            'feature_names': FEATURE_NAMES[disease]
+        }, status_code=400)
+
+    result = await run_in_threadpool(predict_disease, disease, user_input, bool(data.get('explain')))
+    return {'success': True, 'model': disease, **result}
+
+
+# Everything else is served by the Flask app
+app.mount('/', WSGIMiddleware(flask_app))
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run('asgi:app', host='0.0.0.0', port=int(os.getenv('PORT', 8000)))
@@ -0,0 +1,156 @@
+"""
+Content-addressed cache for uploaded document and image analyses.
+
+Uploads are hashed (SHA-256) while they are written to disk. Extracted PDF
+text is cached under the content hash alone; LLM answers are cached under a
+key derived from (content hash, normalized question, model, prompt version),
+so a cached answer is only ever returned for the same document *and* the
+same question. Entries live in a local SQLite file shared by all worker
+processes and are evicted least-recently-used once the cache exceeds its
+size or entry budget, or when they outlive the TTL.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from logs import LOGGER_NAME
+
+log = logging.getLogger(LOGGER_NAME)
+
+CHUNK_SIZE = 64 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access);
+"""
+
+
+def save_and_hash(stream, file_path):
+    """Copy an upload stream to file_path, hashing it on the way; returns (sha256 hex, size)"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(file_path, 'wb') as f:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def normalize_question(question):
+    """Collapse whitespace and case only; anything else could merge different questions"""
+    return ' '.join((question or '').split()).casefold()
+
+
+def analysis_key(content_hash, question, model, prompt_version):
+    """Cache key for an LLM answer about one document to one question"""
+    material = json.dumps([content_hash, normalize_question(question), model, prompt_version])
+    return 'analysis:' + hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def text_key(content_hash):
+    """Cache key for the text extracted from one document"""
+    return 'text:' + content_hash
+
+
+class AnalysisCache:
+    """Bounded LRU key/value cache in a local SQLite file"""
+
+    def __init__(self, db_path, max_bytes=64 * 1024 * 1024, max_entries=5000, ttl=7 * 86400):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Return the cached value for key, or None (cache errors count as misses)"""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value FROM entries WHERE key = ? AND created_at >= ?",
+                    (key, now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            log.warning('analysis_cache_read_failed', extra={'fields': {'error': str(e)}})
+            row = None
+        with self._lock:
+            if row is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return None if row is None else json.loads(row[0])
+
+    def put(self, key, value):
+        """Store a JSON-serializable value and evict down to the budget"""
+        data = json.dumps(value)
+        size = len(data.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, data, size, now, now)
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            log.warning('analysis_cache_write_failed', extra={'fields': {'error': str(e)}})
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Walk from least recently used, deleting until back under both budgets
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def stats(self):
+        """Entry count, size and this process's hit/miss counters"""
+        with self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        with self._lock:
+            return {'entries': count, 'bytes': total, 'hits': self._hits, 'misses': self._misses}
@@ -0,0 +1,216 @@
+"""
+Streaming input-drift statistics for the prediction models.
+
+Each monitor keeps constant-memory running statistics for every model input
+that has a column in the training CSV: count, mean and variance (Welford),
+min/max, and a histogram over bins cut at the training data's quantiles.
+The histogram doubles as the quantile sketch (quantiles are interpolated
+within bins) and gives the population stability index (PSI) against the
+training distribution. An update is a few vectorized numpy operations.
+"""
+import csv
+import os
+import threading
+
+import numpy as np
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# Conventional PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+
+def load_baseline(csv_path, column_map, categories=None):
+    """Read training values from a CSV as {model_feature: array}
+
+    column_map maps model feature names to CSV column names. Text values are
+    translated through categories when given; anything non-numeric is dropped.
+    """
+    categories = categories or {}
+    values = {feature: [] for feature in column_map}
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            for feature, column in column_map.items():
+                raw = (row.get(column) or '').strip()
+                if raw in categories:
+                    values[feature].append(float(categories[raw]))
+                    continue
+                try:
+                    values[feature].append(float(raw))
+                except ValueError:
+                    pass
+    return {feature: np.array(v, dtype=float) for feature, v in values.items() if v}
+
+
+def read_rows(csv_path, column_map, categories=None, limit=None):
+    """Read complete training rows from a CSV as [{model_feature: value}]
+
+    Rows with any missing or non-numeric mapped column are skipped.
+    """
+    categories = categories or {}
+    rows = []
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        for record in csv.DictReader(f):
+            row = {}
+            for feature, column in column_map.items():
+                raw = (record.get(column) or '').strip()
+                try:
+                    row[feature] = float(categories.get(raw, raw))
+                except ValueError:
+                    break
+            else:
+                rows.append(row)
+                if limit and len(rows) >= limit:
+                    break
+    return rows
+
+
+class DriftMonitor:
+    """Constant-memory running statistics and PSI for one model's inputs"""
+
+    def __init__(self, feature_names, baseline, n_bins=20, min_samples=30):
+        self.feature_names = [name for name in feature_names if name in baseline]
+        self._index = np.array([feature_names.index(name) for name in self.feature_names], dtype=np.intp)
+        self.min_samples = min_samples
+
+        n = len(self.feature_names)
+        # Inner bin edges at the baseline quantiles; discrete features collapse
+        # to fewer bins, so rows are padded with +inf edges that are never crossed.
+        edges = np.full((n, n_bins - 1), np.inf)
+        expected = np.zeros((n, n_bins))
+        self._baseline = []
+        for i, name in enumerate(self.feature_names):
+            data = baseline[name]
+            inner = np.unique(np.quantile(data, np.arange(1, n_bins) / n_bins))
+            inner = inner[inner < data.max()]
+            edges[i, :len(inner)] = inner
+            bins = (data[:, None] > edges[i][None, :]).sum(axis=1)
+            expected[i] = np.bincount(bins, minlength=n_bins) / len(data)
+            self._baseline.append({
+                'mean': round(float(data.mean()), 4),
+                'std': round(float(data.std()), 4),
+                'quantiles': _rounded(np.quantile(data, QUANTILES))
+            })
+        self._edges = edges
+        self._expected = expected
+
+        self._lock = threading.Lock()
+        self._count = np.zeros(n)
+        self._mean = np.zeros(n)
+        self._m2 = np.zeros(n)
+        self._min = np.full(n, np.inf)
+        self._max = np.full(n, -np.inf)
+        self._hist = np.zeros((n, n_bins))
+        self._rows = np.arange(n)
+
+    def update(self, user_input):
+        """Fold one model input vector (or a 2-D batch) into the running statistics"""
+        X = np.atleast_2d(np.asarray(user_input, dtype=float))[:, self._index]
+        with self._lock:
+            for x in X:
+                seen = np.isfinite(x)
+                x = np.where(seen, x, 0.0)
+                self._count += seen
+                delta = x - self._mean
+                self._mean += np.where(seen, delta / np.maximum(self._count, 1), 0.0)
+                self._m2 += np.where(seen, delta * (x - self._mean), 0.0)
+                self._min = np.where(seen, np.minimum(self._min, x), self._min)
+                self._max = np.where(seen, np.maximum(self._max, x), self._max)
+                bins = (x[:, None] > self._edges).sum(axis=1)
+                self._hist[self._rows[seen], bins[seen]] += 1
+
+    def snapshot(self):
+        """Return current statistics, quantile estimates and PSI per feature"""
+        with self._lock:
+            count = self._count.copy()
+            mean = self._mean.copy()
+            m2 = self._m2.copy()
+            lo = self._min.copy()
+            hi = self._max.copy()
+            hist = self._hist.copy()
+
+        features = {}
+        for i, name in enumerate(self.feature_names):
+            n = int(count[i])
+            stats = {'count': n, 'baseline': self._baseline[i]}
+            if n:
+                stats['mean'] = round(float(mean[i]), 4)
+                stats['variance'] = round(float(m2[i] / (n - 1)), 4) if n > 1 else 0.0
+                stats['min'] = float(lo[i])
+                stats['max'] = float(hi[i])
+                stats['quantiles'] = _rounded(self._quantiles(hist[i], self._edges[i], lo[i], hi[i]))
+                stats['psi'] = round(_psi(hist[i] / n, self._expected[i]), 4)
+            stats['status'] = _status(stats.get('psi'), n, self.min_samples)
+            features[name] = stats
+
+        psis = [f['psi'] for f in features.values() if f['count'] >= self.min_samples]
+        return {
+            'predictions': int(count.max()) if len(count) else 0,
+            'max_psi': max(psis) if psis else None,
+            'status': _status(max(psis) if psis else None, int(count.max()) if len(count) else 0, self.min_samples),
+            'features': features
+        }
+
+    @staticmethod
+    def _quantiles(hist, edges, lo, hi):
+        """Interpolate quantiles within histogram bins bounded by the observed min/max"""
+        bounds = np.concatenate([[lo], np.clip(edges[np.isfinite(edges)], lo, hi), [hi]])
+        counts = hist[:len(bounds) - 1]
+        cumulative = np.concatenate([[0.0], np.cumsum(counts)]) / counts.sum()
+        return np.interp(QUANTILES, cumulative, bounds)
+
+
+def _psi(actual, expected, eps=1e-4):
+    mask = (actual > 0) | (expected > 0)
+    a = np.clip(actual[mask], eps, None)
+    e = np.clip(expected[mask], eps, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def _status(psi, count, min_samples):
+    if psi is None or count < min_samples:
+        return 'insufficient_data'
+    if psi >= PSI_SIGNIFICANT:
+        return 'significant_drift'
+    if psi >= PSI_MODERATE:
+        return 'moderate_drift'
+    return 'stable'
+
+
+def _rounded(values):
+    return {f'p{int(q * 100):02d}': round(float(v), 4) for q, v in zip(QUANTILES, values)}
+
+
+_METRICS = (
+    ('amarcare_input_count', 'Predictions observed per model input', 'count'),
+    ('amarcare_input_mean', 'Running mean of a model input', 'mean'),
+    ('amarcare_input_variance', 'Running variance of a model input', 'variance'),
+    ('amarcare_input_psi', 'Population stability index against the training data', 'psi'),
+)
+
+
+def prometheus_lines(snapshots):
+    """Render {model_name: snapshot} in Prometheus text exposition format
+
+    Statistics are per worker process, so every series carries a pid label;
+    aggregate across pids when scraping a multi-worker server.
+    """
+    pid = os.getpid()
+    lines = []
+    for metric, help_text, key in _METRICS:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} gauge')
+        for model_name, snapshot in snapshots.items():
+            for feature, stats in snapshot['features'].items():
+                if key in stats:
+                    lines.append(f'{metric}{{model="{model_name}",feature="{feature}",pid="{pid}"}} {stats[key]}')
+
+    lines.append('# HELP amarcare_input_quantile Estimated quantiles of a model input')
+    lines.append('# TYPE amarcare_input_quantile gauge')
+    for model_name, snapshot in snapshots.items():
+        for feature, stats in snapshot['features'].items():
+            for q, value in zip(QUANTILES, stats.get('quantiles', {}).values()):
+                lines.append(f'amarcare_input_quantile{{model="{model_name}",feature="{feature}",quantile="{q}",'
+                             f'pid="{pid}"}} {value}')
+    return lines
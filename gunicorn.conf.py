@@ -0,0 +1,68 @@
+"""
+Production prefork runner.
+
+    gunicorn -c gunicorn.conf.py                          # Flask app (WSGI)
+    GUNICORN_APP=asgi:app gunicorn -c gunicorn.conf.py    # ASGI app on uvicorn workers
+
+The app (and with it the ML models, TreeSHAP tables and drift baselines) is
+loaded once in the master; workers are forked from it and share that memory
+copy-on-write. gc.freeze() moves the preloaded objects out of the collector's
+reach so garbage collection in a worker doesn't touch (and copy) their pages.
+Every worker runs warm-up predictions before it accepts traffic and reports
+readiness at /health/ready.
+
+Drift statistics and LLM usage live in each worker's memory, so /metrics,
+/api/drift and /api/llm-usage describe only the worker that served the
+request. Prometheus series carry a pid label: sum counters and histogram
+buckets across pids (e.g. sum without (pid) (...)) and read the drift
+gauges per worker.
+"""
+import gc
+import multiprocessing
+import os
+
+# Background job workers are threads; start them per worker, never in the master
+os.environ.setdefault('JOB_AUTOSTART', 'false')
+
+wsgi_app = os.getenv('GUNICORN_APP', 'app:app')
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = os.getenv(
+    'GUNICORN_WORKER_CLASS',
+    'uvicorn_worker.UvicornWorker' if wsgi_app.startswith('asgi') else 'gthread'
+)
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+preload_app = True
+accesslog = os.getenv('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+
+
+def when_ready(server):
+    """Master: warm up shared state once, then freeze it before the first fork"""
+    from app import warm_up
+    warm_up()
+    gc.freeze()
+    server.log.info("Preloaded app frozen for copy-on-write sharing")
+
+
+def post_fork(server, worker):
+    """Worker: not ready until its own warm-up has run"""
+    from app import service_state
+    service_state['ready'] = False
+
+
+def post_worker_init(worker):
+    """Worker: warm up and start background job threads before serving"""
+    from app import warm_up, job_queue
+    warm_up()
+    job_queue.start()
+
+
+def worker_exit(server, worker):
+    """Worker: write out queued audit records before the process exits"""
+    from app import audit_trail
+    if audit_trail is not None:
+        audit_trail.flush()
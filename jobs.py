@@ -0,0 +1,340 @@
+"""
+Persistent background job queue for long-running analyses.
+
+Jobs are stored in a local SQLite database and executed by a pool of worker
+threads, so a request can hand off a slow document/image analysis and return
+a job id immediately. Claiming a job is a single IMMEDIATE transaction, which
+makes it safe for several worker processes to share one database. A running
+job holds a lease that its worker renews while the handler runs; if the
+worker dies, the job is picked up again once the lease expires (or marked
+failed if that was its last attempt), so queued and interrupted work
+survives a restart. Idle polling is a plain read; the write lock is only
+taken when there is something to claim.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from logs import LOGGER_NAME
+
+log = logging.getLogger(LOGGER_NAME)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    lease_expires_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, available_at);
+"""
+
+
+class JobQueue:
+    """SQLite-backed job queue with a local worker thread pool"""
+
+    def __init__(self, db_path, workers=2, max_retries=2, result_ttl=3600,
+                 lease_seconds=300, poll_interval=0.5, retry_backoff=5.0):
+        self.db_path = db_path
+        self.workers = workers
+        self.max_retries = max_retries
+        self.result_ttl = result_ttl
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+
+        self._handlers = {}
+        self._cleanup = {}
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit connection; closing it rolls back any unfinished BEGIN
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def register(self, kind, handler, cleanup=None):
+        """Register handler(payload) -> JSON-serializable result for a job kind
+
+        cleanup(payload), if given, runs once the job reaches a final state.
+        """
+        self._handlers[kind] = handler
+        if cleanup:
+            self._cleanup[kind] = cleanup
+
+    def start(self):
+        """Start the worker threads for this process (idempotent, fork-aware)"""
+        with self._lock:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        """Ask the workers to exit after their current job"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, kind, payload):
+        """Queue a job and return its id"""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, max_attempts, created_at, updated_at, available_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload), self.max_retries + 1, now, now, now)
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Return the public view of a job, or None if it does not exist or has expired"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        if row['finished_at'] and row['finished_at'] + self.result_ttl < time.time():
+            return None
+
+        job = {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'finished_at': row['finished_at']
+        }
+        if row['status'] == SUCCEEDED:
+            job['result'] = json.loads(row['result'])
+        if row['error']:
+            job['error'] = row['error']
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns False if it already finished
+
+        A running handler cannot be interrupted, but its result is discarded.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT kind, status, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row['status'] in FINISHED_STATES:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+                (CANCELLED, now, now, job_id)
+            )
+            conn.execute("COMMIT")
+
+        # A running job's files are still in use; its worker cleans up instead
+        if row['status'] == QUEUED:
+            self._run_cleanup(row['kind'], row['payload'])
+        return True
+
+    def purge_expired(self):
+        """Delete finished jobs whose result TTL has passed"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.result_ttl,)
+            )
+            return cursor.rowcount
+
+    def stats(self):
+        """Return job counts by status"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    def _claim(self):
+        now = time.time()
+        # Jobs whose worker died mid-run become claimable once their lease lapses
+        claimable = ("(status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at < ?)",
+                     (QUEUED, now, RUNNING, now))
+        with self._connect() as conn:
+            # Idle polls only read; the write lock is taken when there is work
+            probe = conn.execute(f"SELECT id FROM jobs WHERE {claimable[0]} LIMIT 1", claimable[1]).fetchone()
+            if probe is None:
+                return None
+
+            conn.execute("BEGIN IMMEDIATE")
+            exhausted = conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = ? AND lease_expires_at < ? "
+                "AND attempts >= max_attempts",
+                (RUNNING, now)
+            ).fetchall()
+            for job in exhausted:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ?, finished_at = ?, "
+                    "lease_expires_at = NULL WHERE id = ?",
+                    (FAILED, 'Worker lost on final attempt', now, now, job['id'])
+                )
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE {claimable[0]} ORDER BY created_at LIMIT 1", claimable[1]
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?, lease_expires_at = ? "
+                    "WHERE id = ?",
+                    (RUNNING, now, now + self.lease_seconds, row['id'])
+                )
+            conn.execute("COMMIT")
+
+        for job in exhausted:
+            self._run_cleanup(job['kind'], job['payload'])
+        return row
+
+    def _renew_lease(self, row, done):
+        """Extend a running job's lease every third of lease_seconds until done is set"""
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND status = ? AND attempts = ?",
+                        (time.time() + self.lease_seconds, row['id'], RUNNING, row['attempts'] + 1)
+                    )
+            except sqlite3.Error as e:
+                log.warning('job_lease_renewal_failed', extra={'fields': {'job_id': row['id'], 'error': str(e)}})
+
+    def _finish(self, row, result=None, error=None):
+        """Record a job outcome unless it was cancelled or reclaimed meanwhile
+
+        Returns True if the job is final and its cleanup may run.
+        """
+        now = time.time()
+        attempts = row['attempts'] + 1
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            status = conn.execute("SELECT status, attempts FROM jobs WHERE id = ?", (row['id'],)).fetchone()
+            if status is None or status['status'] in FINISHED_STATES:
+                conn.execute("COMMIT")
+                return True
+            if status['attempts'] != attempts:
+                # Reclaimed after this worker lost its lease; the newer attempt owns the job and its files
+                conn.execute("COMMIT")
+                return False
+
+            if error is None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = NULL, updated_at = ?, finished_at = ?, "
+                    "lease_expires_at = NULL WHERE id = ?",
+                    (SUCCEEDED, json.dumps(result), now, now, row['id'])
+                )
+                final = True
+            elif attempts < row['max_attempts']:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ?, available_at = ?, "
+                    "lease_expires_at = NULL WHERE id = ?",
+                    (QUEUED, error, now, now + self.retry_backoff * attempts, row['id'])
+                )
+                final = False
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ?, finished_at = ?, "
+                    "lease_expires_at = NULL WHERE id = ?",
+                    (FAILED, error, now, now, row['id'])
+                )
+                final = True
+            conn.execute("COMMIT")
+        return final
+
+    def _run_cleanup(self, kind, payload):
+        cleanup = self._cleanup.get(kind)
+        if cleanup is None:
+            return
+        try:
+            cleanup(json.loads(payload))
+        except Exception as e:
+            log.exception('job_cleanup_failed', extra={'fields': {'kind': kind, 'error': str(e)}})
+
+    def _work(self):
+        last_purge = 0.0
+        while not self._stopping.is_set():
+            if time.time() - last_purge > 60:
+                try:
+                    self.purge_expired()
+                except sqlite3.Error as e:
+                    log.warning('job_purge_failed', extra={'fields': {'error': str(e)}})
+                last_purge = time.time()
+
+            try:
+                row = self._claim()
+            except sqlite3.Error as e:
+                log.warning('job_claim_failed', extra={'fields': {'error': str(e)}})
+                row = None
+
+            if row is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            handler = self._handlers.get(row['kind'])
+            done = threading.Event()
+            heartbeat = threading.Thread(target=self._renew_lease, args=(row, done),
+                                         name=f'job-lease-{row["id"][:8]}', daemon=True)
+            heartbeat.start()
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler registered for job kind '{row['kind']}'")
+                result = handler(json.loads(row['payload']))
+                final = self._finish(row, result=result)
+            except Exception as e:
+                log.warning('job_attempt_failed', extra={'fields': {
+                    'job_id': row['id'], 'kind': row['kind'], 'attempt': row['attempts'] + 1, 'error': str(e)
+                }})
+                final = self._finish(row, error=str(e)[:500])
+            finally:
+                done.set()
+
+            if final:
+                self._run_cleanup(row['kind'], row['payload'])
@@ -0,0 +1,200 @@
+"""
+Non-blocking structured logging and the prediction audit trail.
+
+Request handlers only ever put records on an in-memory queue; formatting and
+I/O happen on background threads.
+
+- configure_logging() routes the 'amarcare' logger through a QueueHandler to
+  a QueueListener that writes one JSON object per line to stdout. Records
+  logged with sample=True (per-request chatter) are kept at the configured
+  sampling rate; warnings and errors are always kept.
+- AuditTrail appends one JSON line per prediction. A writer thread drains
+  its queue in batches (one write and flush per batch) and rotates the file
+  once it passes max_bytes. Rotated files are renamed, never truncated or
+  deleted, so the trail is append-only. Each process writes its own file.
+
+Both are fork-safe: threads don't survive a fork, so each process starts
+its own on first use.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+LOGGER_NAME = 'amarcare'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, event and any structured fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage(),
+            'pid': record.process
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep records marked sample=True with probability rate; always keep warnings and errors"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not getattr(record, 'sample', False):
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+class _ProcessQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that starts a listener thread in whichever process it emits from"""
+
+    def __init__(self, handler):
+        super().__init__(queue.SimpleQueue())
+        self._handler = handler
+        self._pid = None
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        super().emit(record)
+
+    def prepare(self, record):
+        # Keep the caller's cost to building the message; JSON encoding happens on the listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A queue inherited through fork has no consumer; start fresh
+            self.queue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(self.queue, self._handler)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def close(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+        super().close()
+
+
+def configure_logging(level='INFO', sample_rate=1.0, stream=None):
+    """Route the app logger through a background JSON writer; returns the logger"""
+    logger = logging.getLogger(LOGGER_NAME)
+    if logger.handlers:
+        return logger
+
+    target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(JsonFormatter())
+    handler = _ProcessQueueHandler(target)
+    handler.addFilter(SamplingFilter(sample_rate))
+
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+
+class AuditTrail:
+    """Append-only, size-rotated JSON-lines file written from a background thread"""
+
+    def __init__(self, directory, prefix='predictions', max_bytes=10 * 1024 * 1024, batch_size=200,
+                 flush_interval=1.0, max_pending=10000):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'{self.prefix}.{os.getpid()}.jsonl')
+
+    def record(self, entry):
+        """Queue one audit entry; never blocks (entries are dropped and counted if the writer falls behind)"""
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        pending = self._queue
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logging.getLogger(LOGGER_NAME).error('audit_write_failed', extra={'fields': {
+                    'error': str(e), 'entries': len(batch)
+                }})
+            finally:
+                for _ in batch:
+                    pending.task_done()
+
+    def _write(self, batch):
+        path = self.path
+        data = ''.join(json.dumps(entry, default=str) + '\n' for entry in batch)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            size = f.tell()
+        if size >= self.max_bytes:
+            stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+            os.rename(path, os.path.join(self.directory, f'{self.prefix}.{os.getpid()}.{stamp}.jsonl'))
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued so far is written, e.g. before shutdown"""
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._queue.all_tasks_done.wait(remaining):
+                    break
@@ -0,0 +1,219 @@
+"""
+On-demand request profiling for production.
+
+ProfilingMiddleware wraps a WSGI app and profiles a request when it carries
+the admin token (X-Profile-Token header) or is picked by the sampling rate.
+A capture records per-function timings with cProfile (wall clock by default,
+CPU time with X-Profile-Mode: cpu), request-level wall/CPU totals, and the
+top allocation sites from tracemalloc. Each capture is written as a standard
+.prof file (pstats / snakeviz / gprof2dot) plus a .json summary.
+Only one capture runs at a time; a token request that finds another capture
+in progress is served unprofiled with an X-Profile-Skipped response header.
+
+The middleware is only installed when profiling is configured, so requests
+pay nothing when it is disabled.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from logs import LOGGER_NAME
+
+log = logging.getLogger(LOGGER_NAME)
+
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 25
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that captures profiles for selected requests"""
+
+    def __init__(self, wsgi_app, profile_dir, admin_token=None, sample_rate=0.0, keep=100,
+                 exclude=('/api/profiles',)):
+        self.wsgi_app = wsgi_app
+        self.profile_dir = profile_dir
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.exclude = tuple(exclude)
+        # tracemalloc is process-wide, so only one capture runs at a time
+        self._capture_lock = threading.Lock()
+        os.makedirs(profile_dir, exist_ok=True)
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO', '').startswith(self.exclude):
+            return self.wsgi_app(environ, start_response)
+        requested = self._has_token(environ.get('HTTP_X_PROFILE_TOKEN'))
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            return self.wsgi_app(environ, start_response)
+        if not self._capture_lock.acquire(blocking=False):
+            if not requested:
+                return self.wsgi_app(environ, start_response)
+
+            # Tell the caller their requested capture didn't happen
+            def skipped(status, headers, exc_info=None):
+                return start_response(status, list(headers) + [('X-Profile-Skipped', 'capture-in-progress')],
+                                      exc_info)
+            return self.wsgi_app(environ, skipped)
+
+        mode = 'cpu' if environ.get('HTTP_X_PROFILE_MODE', '').lower() == 'cpu' else 'wall'
+        capture = _Capture(environ, mode, 'token' if requested else 'sampled')
+        try:
+            capture.start()
+            result = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self._finish(capture)
+            raise
+        # Keep profiling while the response body is produced (streaming views)
+        return _ProfiledBody(result, lambda: self._finish(capture))
+
+    def _has_token(self, token):
+        # compare_digest only accepts ASCII strs; compare bytes so any header value is safe
+        return bool(self.admin_token and token
+                    and hmac.compare_digest(token.encode('utf-8'), self.admin_token.encode('utf-8')))
+
+    def _finish(self, capture):
+        try:
+            capture.stop()
+            capture.save(self.profile_dir)
+            self._prune()
+        except Exception as e:
+            log.exception('profile_capture_failed', extra={'fields': {'path': capture.path, 'error': str(e)}})
+        finally:
+            self._capture_lock.release()
+
+    def _prune(self):
+        summaries = sorted(f for f in os.listdir(self.profile_dir) if f.endswith('.json'))
+        for name in summaries[:-self.keep] if self.keep else []:
+            for path in (name, name[:-5] + '.prof'):
+                try:
+                    os.remove(os.path.join(self.profile_dir, path))
+                except OSError:
+                    pass
+
+    def is_admin(self, token):
+        """True if token grants access to captured profiles"""
+        return self._has_token(token)
+
+
+class _ProfiledBody:
+    """Response iterable that finalizes the capture when the server closes it"""
+
+    def __init__(self, iterable, on_close):
+        self._iterable = iterable
+        self._on_close = on_close
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            self._on_close()
+
+
+class _Capture:
+    def __init__(self, environ, mode, trigger):
+        self.method = environ.get('REQUEST_METHOD', 'GET')
+        self.path = environ.get('PATH_INFO', '/')
+        self.mode = mode
+        self.trigger = trigger
+        self.profiler = cProfile.Profile(time.thread_time if mode == 'cpu' else time.perf_counter)
+        self._started_tracemalloc = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.started_at = datetime.now()
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.wall_ms = (time.perf_counter() - self._wall) * 1000
+        self.cpu_ms = (time.thread_time() - self._cpu) * 1000
+        self.snapshot = tracemalloc.take_snapshot()
+        _, self.peak_bytes = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+    def save(self, profile_dir):
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', self.path).strip('-') or 'root'
+        name = f"{self.started_at.strftime('%Y%m%dT%H%M%S')}_{self.method}_{slug[:60]}_{uuid.uuid4().hex[:6]}"
+
+        self.profiler.dump_stats(os.path.join(profile_dir, name + '.prof'))
+
+        stats = pstats.Stats(self.profiler)
+        functions = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            functions.append({
+                'function': f'{_short_path(filename)}:{line}({function})',
+                'calls': calls,
+                'total_ms': round(total * 1000, 3),
+                'cumulative_ms': round(cumulative * 1000, 3)
+            })
+        functions.sort(key=lambda f: f['cumulative_ms'], reverse=True)
+
+        allocations = [
+            {
+                'location': f'{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}',
+                'size_bytes': stat.size,
+                'count': stat.count
+            }
+            for stat in self.snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+        ]
+
+        summary = {
+            'id': name,
+            'method': self.method,
+            'path': self.path,
+            'trigger': self.trigger,
+            'timer': self.mode,
+            'captured_at': self.started_at.isoformat(),
+            'wall_ms': round(self.wall_ms, 3),
+            'cpu_ms': round(self.cpu_ms, 3),
+            'peak_traced_bytes': self.peak_bytes,
+            'profile_file': name + '.prof',
+            'top_functions': functions[:TOP_FUNCTIONS],
+            'top_allocations': allocations
+        }
+        with open(os.path.join(profile_dir, name + '.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+def _short_path(filename):
+    # Keep the package directory so flask/app.py and our app.py stay distinct
+    return '/'.join(filename.replace(os.sep, '/').split('/')[-2:])
+
+
+def list_profiles(profile_dir, limit=50):
+    """Summaries of the most recent captures, newest first"""
+    if not os.path.isdir(profile_dir):
+        return []
+    names = sorted((f for f in os.listdir(profile_dir) if f.endswith('.json')), reverse=True)[:limit]
+    profiles = []
+    for name in names:
+        try:
+            with open(os.path.join(profile_dir, name)) as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        profiles.append({key: summary.get(key) for key in (
+            'id', 'method', 'path', 'trigger', 'timer', 'captured_at', 'wall_ms', 'cpu_ms',
+            'peak_traced_bytes', 'profile_file'
+        )})
+    return profiles
@@ -0,0 +1,128 @@
+"""
+Local BM25 retrieval over the app's curated health content.
+
+KnowledgeIndex builds an inverted index (term -> postings of document and
+term frequency) at startup. A query only touches the postings of its own
+terms, so answering takes well under a millisecond for this corpus.
+
+Besides the BM25 ranking, each hit carries a confidence: the share of the
+query's IDF weight that the best document actually covers. Query terms the
+index has never seen count at full weight, so a question about something
+the curated content doesn't cover ("symptoms of diabetes") stays below the
+threshold and goes to the LLM instead.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+STOPWORDS = {
+    'a', 'about', 'am', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'can', 'could', 'do', 'does', 'for',
+    'from', 'get', 'give', 'good', 'have', 'how', 'i', 'if', 'in', 'is', 'it', 'me', 'my', 'of', 'on',
+    'or', 'please', 'should', 'some', 'tell', 'than', 'that', 'the', 'their', 'there', 'this', 'to', 'way',
+    'ways', 'what', 'when', 'which', 'who', 'why', 'will', 'with', 'would', 'you', 'your', 'much', 'many',
+    'best', 'know', 'need', 'want', 'someone', 'per'
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def stem(word):
+    """Light suffix stripping so 'exercises', 'exercising' and 'exercise' share a term"""
+    for suffixes in ((('ies', 'y'), ('es', ''), ('s', '')), (('ing', ''), ('ion', ''), ('ed', ''), ('e', ''))):
+        for suffix, replacement in suffixes:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                word = word[:-len(suffix)] + replacement
+                break
+    return word
+
+
+def analyze(text):
+    """Text -> list of index terms"""
+    words = _WORD.findall((text or '').lower().replace("'", ''))
+    return [stem(word) for word in words if word not in STOPWORDS]
+
+
+def load_faq(path):
+    """Documents from a JSON list of {question, answer, keywords?}; missing file -> []"""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        entries = json.load(f)
+    return [
+        {
+            'id': f'faq:{i}',
+            'title': entry['question'],
+            'text': entry['answer'],
+            'keywords': ' '.join(entry.get('keywords', []))
+        }
+        for i, entry in enumerate(entries)
+        if entry.get('question') and entry.get('answer')
+    ]
+
+
+class KnowledgeIndex:
+    """BM25 index over documents with 'id', 'title', 'text' and optional 'keywords'"""
+
+    def __init__(self, documents, k1=1.2, b=0.75):
+        self.documents = list(documents)
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(list)
+        self._lengths = []
+
+        for index, document in enumerate(self.documents):
+            # Titles and keywords are short, so they count double to outweigh body text
+            terms = (analyze(document['title']) * 2 + analyze(document.get('keywords', '')) * 2
+                     + analyze(document['text']))
+            self._lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                self._postings[term].append((index, count))
+
+        count = len(self.documents)
+        self._average_length = sum(self._lengths) / count if count else 0.0
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        self._unseen_idf = math.log(1 + (count + 0.5) / 0.5)
+
+    def search(self, query, top_k=3):
+        """Best matches as [{'document', 'score', 'confidence', 'query_terms'}], highest score first"""
+        terms = set(analyze(query))
+        if not terms or not self.documents:
+            return []
+
+        scores = defaultdict(float)
+        matched = defaultdict(float)
+        for term in terms:
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for index, frequency in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[index] / self._average_length)
+                scores[index] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+                matched[index] += idf
+
+        query_weight = sum(self._idf.get(term, self._unseen_idf) for term in terms)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        return [
+            {
+                'document': self.documents[index],
+                'score': round(scores[index], 4),
+                'confidence': round(matched[index] / query_weight, 4),
+                'query_terms': len(terms)
+            }
+            for index in ranked
+        ]
+
+    def answer(self, query, min_confidence=0.75, min_terms=2):
+        """The best document if it covers the question confidently enough, else None"""
+        hits = self.search(query, top_k=1)
+        if not hits:
+            return None
+        best = hits[0]
+        if best['query_terms'] < min_terms or best['confidence'] < min_confidence:
+            return None
+        return best
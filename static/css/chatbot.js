@@ -73,11 +73,24 @@ class HealthChatbot {
                 body: formData
             });
             
-            const data = await response.json();
+            let data = await response.json();
             
             // Remove typing indicator
             this.removeTypingIndicator(typingId);
             
+            // Emergency guidance arrives at once; the full answer follows
+            if (data.type === 'emergency' && data.follow_up) {
+                this.addMessage(data.response, 'bot');
+                const followUpId = this.showTypingIndicator();
+                formData.append('triage', data.follow_up.triage);
+                const followUp = await fetch('/chatbot', {
+                    method: 'POST',
+                    body: formData
+                });
+                data = await followUp.json();
+                this.removeTypingIndicator(followUpId);
+            }
+            
             // Add bot response
             this.addMessage(data.response, 'bot', null, data.has_file);
             
@@ -0,0 +1,73 @@
+"""
+Regression phrases for the emergency matcher.
+
+COMMON_WORDS, CONTEXT_WORDS and the question cues in triage.py are tuned by
+hand against the app's trigger list; these cases pin what must and must not
+count as an emergency.
+"""
+import os
+import tempfile
+
+import pytest
+
+_scratch = tempfile.mkdtemp(prefix='amarcare-tests-')
+os.environ.setdefault('JOB_AUTOSTART', 'false')
+os.environ.setdefault('JOB_DB_PATH', os.path.join(_scratch, 'jobs.db'))
+os.environ.setdefault('ANALYSIS_CACHE_PATH', os.path.join(_scratch, 'analysis_cache.db'))
+os.environ.setdefault('UPLOAD_FOLDER', os.path.join(_scratch, 'uploads'))
+os.environ.setdefault('AUDIT_DIR', os.path.join(_scratch, 'audit'))
+
+from app import emergency_matcher  # noqa: E402
+
+EMERGENCIES = [
+    "I have crushing chest pain",
+    "I think I am having a heart attack",
+    "i cant breathe!!",
+    "I feel suicidal",
+    "he fainted and is unresponsive",
+    "throat is closing after eating peanuts",
+    "what is happening, I have chest pain",
+    "my kid is having a seizure what do i do",
+    # One-edit typos, including short words
+    "chest pian and shortnes of breath",
+    "my chset hurts",
+    "i got a severe brun",
+    "I'm having a siezure",
+    "my friend is chokign",
+    "he is unconcious",
+    "bleding heavily",
+    "chest pains since an hour",
+]
+
+NOT_EMERGENCIES = [
+    # Ordinary words one edit away from a trigger word
+    "I love cooking dinner",
+    "I enjoy painting on weekends",
+    "there is a threat to my property",
+    "I had a severe burp after dinner",
+    "the market may collapse",
+    "I get my worst headache every morning",
+    "I paid in cash",
+    # Negated
+    "no chest pain, just a cough",
+    # Informational questions about a topic
+    "how do I reduce my risk of a heart attack?",
+    "side effects of seizure medication?",
+    "what is the suicide prevention hotline",
+    "my father had a stroke last year",
+    "heart attack symptoms in women",
+    "what is anaphylaxis",
+    "how to treat a severe burn",
+    "what are the signs of a heart attack",
+    "symptoms of choking in toddlers",
+]
+
+
+@pytest.mark.parametrize('message', EMERGENCIES)
+def test_emergency_detected(message):
+    assert emergency_matcher.match(message)
+
+
+@pytest.mark.parametrize('message', NOT_EMERGENCIES)
+def test_not_an_emergency(message):
+    assert emergency_matcher.match(message) == []
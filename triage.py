@@ -0,0 +1,181 @@
+"""
+Emergency-symptom matching for chatbot messages.
+
+EmergencyMatcher compiles trigger phrases into a word-level Aho-Corasick
+automaton once at startup, so checking a message is a single pass over its
+words regardless of how many phrases there are. Simple typos are absorbed
+by mapping a message word of FUZZY_MIN_LENGTH or more onto the one trigger
+word it is a single edit away from (a substituted, missing or extra letter,
+or a swapped pair of adjacent letters), never in the first letter. Ordinary
+words that happen to be that close to a trigger word ("cooking" / "choking",
+"burp" / "burn") are listed in COMMON_WORDS and never remapped.
+
+A phrase preceded by a negation ("no chest pain") does not count, nor does
+one asked about rather than reported: right after a question cue ("what is
+anaphylaxis", "how to treat a severe burn") or right before a word such as
+"symptoms" ("heart attack symptoms in women"). Phrases registered as topics
+("heart attack", "seizure") also don't count when a context word nearby
+marks the message as informational ("risk of a heart attack", "seizure
+medication").
+"""
+import re
+from collections import deque
+
+FUZZY_MIN_LENGTH = 4
+NEGATIONS = {'no', 'not', 'without', 'never', 'dont', 'didnt', 'doesnt', 'denies', 'deny'}
+NEGATION_WINDOW = 2
+
+# Informational context that suppresses topic triggers within CONTEXT_WINDOW words either side
+CONTEXT_WORDS = {
+    'risk', 'risks', 'prevent', 'prevention', 'preventing', 'history', 'medication', 'medications',
+    'medicine', 'medicines', 'drug', 'drugs', 'hotline', 'helpline', 'year', 'years',
+    'previous', 'survivor', 'survivors', 'awareness', 'research', 'statistics', 'recovery',
+    'recovering', 'rehab', 'rehabilitation', 'insurance'
+}
+CONTEXT_WINDOW = 3
+
+# Question cues: word sequences directly before a phrase (articles in between are skipped)
+# and words directly after it
+QUESTION_PREFIXES = {
+    ('what', 'is'), ('what', 'are'), ('whats',), ('define',), ('signs', 'of'), ('symptoms', 'of'),
+    ('causes', 'of'), ('how', 'to', 'treat'), ('how', 'to', 'prevent'), ('how', 'to', 'recognize'),
+    ('treatment', 'for'), ('treatment', 'of')
+}
+QUESTION_SUFFIXES = {'symptoms', 'signs', 'causes', 'treatment', 'treatments', 'definition'}
+ARTICLES = {'a', 'an', 'the'}
+
+# Everyday words one typo away from a trigger word; these are never remapped
+COMMON_WORDS = {
+    'attach', 'blandness', 'blending', 'bleeping', 'breach', 'breeding', 'buried', 'burped', 'burner',
+    'cannon', 'cloning', 'contusion', 'cooking', 'crashing', 'decree', 'dropping', 'drooling', 'gashing',
+    'loving', 'parsed', 'pasted', 'paused', 'passes', 'property', 'severs', 'shallow', 'slurped',
+    'smelling', 'sneaking', 'sodden', 'spelling', 'stepped', 'stomped', 'stooped', 'stopper', 'strike',
+    'strobe', 'strove', 'threat', 'fainter', 'breathy',
+    'attacks', 'bury', 'burp', 'burps', 'burr', 'cast', 'cheat', 'chess', 'collapse', 'collapses',
+    'even', 'every', 'fact', 'feinted', 'feinting', 'hart', 'heard', 'hears', 'heat', 'huts', 'last',
+    'less', 'lief', 'like', 'line', 'list', 'live', 'lots', 'more', 'pair', 'paid', 'pail', 'paint',
+    'pina', 'plain', 'selling', 'site', 'size', 'sort', 'stack', 'step', 'stock', 'tall', 'task', 'wait',
+    'went', 'worse', 'worts'
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase words with apostrophes dropped (can't -> cant)"""
+    return _WORD.findall((text or '').lower().replace("'", '').replace('’', ''))
+
+
+def _substitutions(word):
+    """Wildcard patterns for one substituted letter after the first"""
+    return [word[:i] + '?' + word[i + 1:] for i in range(1, len(word))]
+
+
+def _deletions(word):
+    """Words with one letter after the first removed"""
+    return [word[:i] + word[i + 1:] for i in range(1, len(word))]
+
+
+def _transpositions(word):
+    """Words with one adjacent pair swapped, keeping the first letter"""
+    return [word[:i] + word[i + 1] + word[i] + word[i + 2:] for i in range(1, len(word) - 1)
+            if word[i] != word[i + 1]]
+
+
+class EmergencyMatcher:
+    """Multi-pattern matcher mapping trigger phrases to emergency labels"""
+
+    def __init__(self, triggers, topics=()):
+        # triggers: {label: [phrase, ...]}; topics: phrases that context words can suppress
+        self._labels = list(triggers)
+        topics = {tuple(tokenize(phrase)) for phrase in topics}
+        vocabulary = set()
+        phrases = []
+        for index, label in enumerate(self._labels):
+            for phrase in triggers[label]:
+                words = tokenize(phrase)
+                if words:
+                    phrases.append((words, index, tuple(words) in topics))
+                    vocabulary.update(words)
+
+        # Typo lookup: trigger words by their substitution patterns ('?' marks the changed
+        # letter, never the first) and by their forms with one letter missing
+        self._vocabulary = vocabulary
+        self._near = {}
+        for word in vocabulary:
+            if len(word) >= FUZZY_MIN_LENGTH:
+                for key in _substitutions(word) + _deletions(word):
+                    self._near.setdefault(key, set()).add(word)
+
+        self._build(phrases)
+
+    def _build(self, phrases):
+        # Node 0 is the root; goto[node] maps a word to the next node
+        self._goto = [{}]
+        self._output = [[]]
+        for words, index, topic in phrases:
+            node = 0
+            for word in words:
+                if word not in self._goto[node]:
+                    self._goto.append({})
+                    self._output.append([])
+                    self._goto[node][word] = len(self._goto) - 1
+                node = self._goto[node][word]
+            self._output[node].append((len(words), index, topic))
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def _canonical(self, word):
+        if word in self._vocabulary or word in COMMON_WORDS or len(word) < FUZZY_MIN_LENGTH:
+            return word
+        # Swapped pair or extra letter in the message word
+        candidates = {edit for edit in _transpositions(word) + _deletions(word)
+                      if edit in self._vocabulary and len(edit) >= FUZZY_MIN_LENGTH}
+        # Substituted or missing letter
+        for key in _substitutions(word) + [word]:
+            candidates.update(self._near.get(key, ()))
+        # A word one edit away from two trigger words is left alone
+        return candidates.pop() if len(candidates) == 1 else word
+
+    def _asked_about(self, words, start, end):
+        """True if the phrase at words[start:end + 1] is the subject of a question"""
+        while start and words[start - 1] in ARTICLES:
+            start -= 1
+        before = tuple(words[max(0, start - 3):start])
+        if any(before[-len(cue):] == cue for cue in QUESTION_PREFIXES):
+            return True
+        return end + 1 < len(words) and words[end + 1] in QUESTION_SUFFIXES
+
+    def match(self, text):
+        """Labels of all emergency triggers in text, in order of first appearance"""
+        raw = tokenize(text)
+        words = [self._canonical(word) for word in raw]
+        found = []
+        node = 0
+        for position, word in enumerate(words):
+            while node and word not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(word, 0)
+            for length, index, topic in self._output[node]:
+                start = position - length + 1
+                # Cues are read from the words as typed, never from typo corrections
+                if NEGATIONS.intersection(raw[max(0, start - NEGATION_WINDOW):start]):
+                    continue
+                if self._asked_about(raw, start, position):
+                    continue
+                if topic and CONTEXT_WORDS.intersection(
+                        raw[max(0, start - CONTEXT_WINDOW):start] + raw[position + 1:position + 1 + CONTEXT_WINDOW]):
+                    continue
+                if index not in found:
+                    found.append(index)
+        return [self._labels[index] for index in found]
@@ -0,0 +1,205 @@
+"""
+LLM usage and latency accounting.
+
+UsageTracker records every Gemini call (model, request type, prompt/output
+tokens, prompt bytes, attachment bytes, time to first byte and total
+latency) into fixed-width time buckets per (model, request type). Buckets
+older than the longest window are dropped, so memory stays constant and a
+rolling-window summary is a sum over at most a few hundred small buckets.
+Latencies go into a fixed histogram per bucket, from which percentiles are
+interpolated.
+
+Lifetime counters and histograms are kept alongside for Prometheus, which
+does its own windowing with rate()/histogram_quantile(). All figures are
+per process.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+WINDOWS = (60, 900, 3600)
+BUCKET_SECONDS = 10
+
+# Histogram upper bounds in seconds for TTFB and total latency
+LATENCY_BOUNDS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, float('inf'))
+
+_SUMS = ('calls', 'errors', 'prompt_tokens', 'output_tokens', 'prompt_bytes', 'attachment_bytes',
+         'ttfb_seconds', 'latency_seconds')
+
+
+def _empty():
+    stats = dict.fromkeys(_SUMS, 0)
+    stats['ttfb_histogram'] = [0] * len(LATENCY_BOUNDS)
+    stats['latency_histogram'] = [0] * len(LATENCY_BOUNDS)
+    return stats
+
+
+def _observe(histogram, seconds):
+    for i, bound in enumerate(LATENCY_BOUNDS):
+        if seconds <= bound:
+            histogram[i] += 1
+            return
+
+
+def _merge(target, stats):
+    for key in _SUMS:
+        target[key] += stats[key]
+    for key in ('ttfb_histogram', 'latency_histogram'):
+        target[key] = [a + b for a, b in zip(target[key], stats[key])]
+
+
+def _percentile(histogram, q):
+    """Interpolated q-quantile (seconds) from a LATENCY_BOUNDS histogram"""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    lower = 0.0
+    for count, upper in zip(histogram, LATENCY_BOUNDS):
+        if count and seen + count >= rank:
+            if upper == float('inf'):
+                return lower
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+        lower = upper
+    return lower
+
+
+class UsageTracker:
+    """Rolling-window and lifetime accounting of LLM calls"""
+
+    def __init__(self, windows=WINDOWS, bucket_seconds=BUCKET_SECONDS):
+        self.windows = tuple(sorted(windows))
+        self.bucket_seconds = bucket_seconds
+        self._lock = threading.Lock()
+        self._buckets = deque()  # (bucket start, {(model, kind): stats}), oldest first
+        self._totals = {}
+
+    def record(self, model, kind, prompt_tokens=0, output_tokens=0, prompt_bytes=0, attachment_bytes=0,
+               ttfb=0.0, latency=0.0, error=False):
+        """Account one LLM call; ttfb and latency are in seconds"""
+        now = time.time()
+        start = now - now % self.bucket_seconds
+        key = (model, kind)
+        with self._lock:
+            if not self._buckets or self._buckets[-1][0] != start:
+                self._buckets.append((start, {}))
+                self._expire(now)
+            for stats in (self._buckets[-1][1].setdefault(key, _empty()), self._totals.setdefault(key, _empty())):
+                stats['calls'] += 1
+                stats['errors'] += int(error)
+                stats['prompt_tokens'] += prompt_tokens
+                stats['output_tokens'] += output_tokens
+                stats['prompt_bytes'] += prompt_bytes
+                stats['attachment_bytes'] += attachment_bytes
+                stats['ttfb_seconds'] += ttfb
+                stats['latency_seconds'] += latency
+                _observe(stats['ttfb_histogram'], ttfb)
+                _observe(stats['latency_histogram'], latency)
+
+    def _expire(self, now):
+        while self._buckets and self._buckets[0][0] + self.bucket_seconds <= now - self.windows[-1]:
+            self._buckets.popleft()
+
+    def summary(self):
+        """Per-window, per (model, request type) call statistics"""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            buckets = list(self._buckets)
+
+        result = {}
+        for window in self.windows:
+            merged = {}
+            for start, groups in buckets:
+                if start + self.bucket_seconds <= now - window:
+                    continue
+                for key, stats in groups.items():
+                    _merge(merged.setdefault(key, _empty()), stats)
+            result[f'{window}s'] = [_describe(model, kind, stats) for (model, kind), stats in sorted(merged.items())]
+        return result
+
+    def totals(self):
+        """Lifetime statistics per (model, request type)"""
+        with self._lock:
+            return {key: {k: list(v) if isinstance(v, list) else v for k, v in stats.items()}
+                    for key, stats in self._totals.items()}
+
+
+def _describe(model, kind, stats):
+    calls = stats['calls']
+
+    def average(key, digits=1):
+        return round(stats[key] / calls, digits) if calls else None
+
+    def percentile_ms(histogram, q):
+        value = _percentile(stats[histogram], q)
+        return None if value is None else round(value * 1000, 1)
+
+    return {
+        'model': model,
+        'request_type': kind,
+        'calls': calls,
+        'errors': stats['errors'],
+        'prompt_tokens': stats['prompt_tokens'],
+        'output_tokens': stats['output_tokens'],
+        'avg_prompt_tokens': average('prompt_tokens'),
+        'avg_output_tokens': average('output_tokens'),
+        'avg_prompt_bytes': average('prompt_bytes'),
+        'avg_attachment_bytes': average('attachment_bytes'),
+        'ttfb_ms': {
+            'avg': round(stats['ttfb_seconds'] / calls * 1000, 1) if calls else None,
+            'p50': percentile_ms('ttfb_histogram', 0.5),
+            'p95': percentile_ms('ttfb_histogram', 0.95)
+        },
+        'latency_ms': {
+            'avg': round(stats['latency_seconds'] / calls * 1000, 1) if calls else None,
+            'p50': percentile_ms('latency_histogram', 0.5),
+            'p95': percentile_ms('latency_histogram', 0.95)
+        }
+    }
+
+
+_COUNTERS = (
+    ('amarcare_llm_calls_total', 'LLM calls', 'calls'),
+    ('amarcare_llm_errors_total', 'Failed LLM calls', 'errors'),
+    ('amarcare_llm_prompt_tokens_total', 'Prompt tokens sent to the LLM', 'prompt_tokens'),
+    ('amarcare_llm_output_tokens_total', 'Output tokens returned by the LLM', 'output_tokens'),
+    ('amarcare_llm_prompt_bytes_total', 'Prompt text bytes sent to the LLM', 'prompt_bytes'),
+    ('amarcare_llm_attachment_bytes_total', 'Attachment bytes analysed by the LLM', 'attachment_bytes'),
+)
+
+_HISTOGRAMS = (
+    ('amarcare_llm_ttfb_seconds', 'Time to first byte of LLM responses', 'ttfb_histogram', 'ttfb_seconds'),
+    ('amarcare_llm_latency_seconds', 'Total latency of LLM calls', 'latency_histogram', 'latency_seconds'),
+)
+
+
+def prometheus_lines(totals):
+    """Render UsageTracker.totals() in Prometheus text exposition format
+
+    Every series carries a pid label; sum across pids for server-wide totals.
+    """
+    pid = os.getpid()
+    lines = []
+    for metric, help_text, key in _COUNTERS:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for (model, kind), stats in sorted(totals.items()):
+            lines.append(f'{metric}{{model="{model}",request_type="{kind}",pid="{pid}"}} {stats[key]}')
+
+    for metric, help_text, histogram, total in _HISTOGRAMS:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for (model, kind), stats in sorted(totals.items()):
+            labels = f'model="{model}",request_type="{kind}",pid="{pid}"'
+            cumulative = 0
+            for count, bound in zip(stats[histogram], LATENCY_BOUNDS):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else bound
+                lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{{labels}}} {round(stats[total], 6)}')
+            lines.append(f'{metric}_count{{{labels}}} {stats["calls"]}')
+    return lines